@@ -1,9 +1,11 @@
-from typing import Self
+from functools import cached_property
+from typing import Callable, Self
 import numpy as np
 import pandas as pd
-import copy
 
 class Module:    
+    __slots__ = ("module_id", "module_name", "credits", "semester", "group", "total_spaces", "available_spaces", "mutual_exclusions", "requirements")
+
     def __init__(self, module_id:str, module_name:str, credits:int, semester:int, group:str, total_spaces:int, available_spaces:int, mutual_exclusions:list[Self], requirements:list[Self]) -> None:
         self.module_id = module_id
         self.module_name = module_name
@@ -22,72 +24,613 @@ class Module:
         self.mutual_exclusions = list(set(self.mutual_exclusions).union(mutual_exclusions))
         for module in mutual_exclusions:
             if self not in module.mutual_exclusions:
-                module.add_mutual_exclusions([self])
+                module.mutual_exclusions = module.mutual_exclusions + [self]
 
     def add_requirements(self, requirements:list[Self]):
-        self.requirements = list(set(self.requirements).union(requirements))
+        # Keep the requirements in the order they were added, so that they are listed in a consistent order
+        self.requirements = list(dict.fromkeys(self.requirements + list(requirements)))
+
+    def get_all_requirements(self) -> list[Self]:
+        """Get the requirements of this module, the requirements of those modules, and so on.
+
+        Returns:
+            list[Module]: Every module that must be assigned alongside this one, not including this module
+        """
+        all_requirements:dict[Self, None] = dict()
+        to_visit = list(self.requirements)
+        while len(to_visit) > 0:
+            module = to_visit.pop()
+            if module is not self and module not in all_requirements:
+                all_requirements[module] = None
+                to_visit += module.requirements
+        return list(all_requirements)
 
 class Student:
-    def __init__(self, name:str, id:str, preferred_modules_per_group:dict[str, int], module_rankings:dict[str, int], excluded_modules:list[str]):
+    """A view onto one row of a StudentCohort"""
+    __slots__ = ("name", "id", "cohort", "idx")
+
+    def __init__(self, name:str, id:str, cohort:"StudentCohort", idx:int):
         self.name = name
         self.id = id
-        self.module_rankings_by_id = module_rankings
-        self.preferred_modules_per_group = preferred_modules_per_group
-        self.excluded_modules_by_id = excluded_modules
+        self.cohort = cohort
+        self.idx = idx
+
+    @property
+    def module_rankings_by_id(self) -> dict[str, float]:
+        rankings = self.cohort.module_rankings[self.idx]
+        return {m_id: (r if r != StudentCohort.UNRANKED else np.inf) for m_id, r in zip(self.cohort.module_ids, rankings.tolist())}
+
+    @property
+    def preferred_modules_per_group(self) -> dict[str, int]:
+        return dict(zip(self.cohort.module_groups, self.cohort.preferred_modules_per_group[self.idx]))
+
+    @property
+    def excluded_modules_by_id(self) -> list[str]:
+        return [self.cohort.module_ids[m_idx] for m_idx in np.flatnonzero(self.cohort.excluded_modules[self.idx])]
 
     def __repr__(self) -> str:
         return f"{self.name}"
 
 
+class StudentCohort:
+    """An immutable, columnar store of the students' names, IDs and preferences. Rows of the
+    arrays correspond to students, and columns to the modules in module_ids or the groups in
+    module_groups. A cohort holds no allocation state, so it can be shared by any number of
+    module assigners.
+    """
+    # Ranking given to modules that a student did not rank
+    UNRANKED = np.iinfo(np.int16).max
+
+    def __init__(self, names:list[str], ids:list[str], module_ids:list[str], module_rankings:np.ndarray, excluded_modules:np.ndarray, module_groups:list[str], preferred_modules_per_group:np.ndarray):
+        self.n_students = len(ids)
+        self.names = list(names)
+        self.ids = list(ids)
+        self.module_ids = list(module_ids)
+        self.module_groups = list(module_groups)
+        self.module_rankings = np.asarray(module_rankings, dtype=np.int16).reshape(self.n_students, len(self.module_ids))
+        self.excluded_modules = np.asarray(excluded_modules, dtype=bool).reshape(self.n_students, len(self.module_ids))
+        self.preferred_modules_per_group = np.asarray(preferred_modules_per_group).reshape(self.n_students, len(self.module_groups))
+        for a in [self.module_rankings, self.excluded_modules, self.preferred_modules_per_group]:
+            a.flags.writeable = False
+
+        self.students = [Student(name, id, self, idx) for idx, (name, id) in enumerate(zip(self.names, self.ids))]
+
+    @classmethod
+    def from_students(cls, students:list[Student]) -> Self:
+        """Get the cohort containing the given students, in the given order
 
-#TODO: What object should keep tract of remaining spaces on each module? Probably the assigner rather than the module objects (which can be shared between assigners)
-class ModuleAssigner:
-    def __init__(self, students:list[Student], modules:list[Module], required_credits_per_student:int, max_credits_per_group:dict[str, int], max_credits_per_semester:dict[str, int], min_credits_per_group:dict[str, int], min_credits_per_semester:dict[str, int], random_seed:int):
-        self._n_students = len(students)
-        self._students = copy.deepcopy(students)
-        self._student_ids = [s.id for s in self._students]
-        self._modules = copy.deepcopy(modules)
-        self._required_credits_per_student = required_credits_per_student
-        self._unique_module_groups = list(set([m.group for m in self._modules]))
-        self._unique_semesters = list(set([m.semester for m in self._modules]))
-        self._grouped_modules = [[m for m in self._modules if m.group == group_label] for group_label in self._unique_module_groups]
-        self._student_module_grouped_preferences = [np.array([[s.module_rankings_by_id[m.module_id] for m in module_group] for s in self._students]) for module_group in self._grouped_modules]
-        self._student_module_group_credit_preferences = np.array([[s.preferred_modules_per_group[g] for g in self._unique_module_groups] for s in self._students])
-        self._max_credits_per_group = [max_credits_per_group[g_id] for g_id in self._unique_module_groups]
-        self._max_credits_per_semester = [max_credits_per_semester[i] for i in self._unique_semesters]
-        self._min_credits_per_group = [min_credits_per_group[g_id] for g_id in self._unique_module_groups]
-        self._min_credits_per_semester = [min_credits_per_semester[i] for i in self._unique_semesters]
+        Args:
+            students (list[Student]): Students belonging to one cohort
 
-        # list of N groups 2d arrays (one row per student, one column per module) containing assignments of students to each module in each group
-        # TODO: Make it possible to load in how may credits the student has already been assigned
-        self._student_assigned_credits = [np.zeros((len(self._students), len(self._grouped_modules[i])), dtype=np.int16) for i in range(len(self._unique_module_groups))]
+        Returns:
+            StudentCohort: The students' cohort, or a new cohort containing just these students
+        """
+        cohorts = set([s.cohort for s in students])
+        if len(cohorts) == 1 and cohorts.pop().students == list(students):
+            return students[0].cohort
+        if len(cohorts) > 1:
+            raise ValueError("The students must all belong to the same cohort")
+        cohort = students[0].cohort if len(students) > 0 else cls([], [], [], [], [], [], [])
+        idxs = [s.idx for s in students]
+        return cls([s.name for s in students], [s.id for s in students], cohort.module_ids, cohort.module_rankings[idxs], cohort.excluded_modules[idxs], cohort.module_groups, cohort.preferred_modules_per_group[idxs])
+
+    def get_module_columns(self, module_ids:list[str]) -> np.ndarray:
+        """Get the column index of each of the given modules. Modules missing from the cohort
+        get index -1.
 
-        # Spaces remaining on each module
-        #self._module_spaces_remaining = dict(zip(self._modules, map(lambda m: m.available_spaces, self._modules)))
+        Args:
+            module_ids (list[str]): IDs of the modules
 
-        # Number of times the algorithm attempted to assign a student to each module
-        self._module_spaces_excess_requests = dict(zip(self._modules, [0 for _ in range(len(self._modules))]))
+        Returns:
+            np.ndarray: An array of column indices
+        """
+        columns = dict(zip(self.module_ids, range(len(self.module_ids))))
+        return np.array([columns.get(m_id, -1) for m_id in module_ids], dtype=np.intp)
+
+    def __len__(self) -> int:
+        return self.n_students
+
+    def __iter__(self):
+        return iter(self.students)
+
+    def __getitem__(self, idx:int) -> Student:
+        return self.students[idx]
+
+
+
+class ModuleCatalogue:
+    """An immutable, integer-indexed representation of a list of modules. Module indices
+    refer to positions in the modules list. A catalogue holds no allocation state, so a
+    single catalogue can be shared by any number of module assigners.
+    """
+    def __init__(self, modules:list[Module]):
+        self.modules = tuple(modules)
+        self.n_modules = len(self.modules)
+        self.module_ids = [m.module_id for m in self.modules]
+        self.module_groups = list(dict.fromkeys([m.group for m in self.modules]))
+        self.semesters = list(dict.fromkeys([m.semester for m in self.modules]))
+
+        module_idxs = dict(zip(self.modules, range(self.n_modules)))
+        self.credits = np.array([m.credits for m in self.modules], dtype=np.int64)
+        self.group_idxs = np.array([self.module_groups.index(m.group) for m in self.modules], dtype=np.intp)
+        self.semester_idxs = np.array([self.semesters.index(m.semester) for m in self.modules], dtype=np.intp)
+        self.total_spaces = np.array([m.total_spaces for m in self.modules], dtype=np.int64)
+        self.available_spaces = np.array([m.available_spaces for m in self.modules], dtype=np.int64)
+
+        # Symmetric (# modules, # modules) boolean matrix, which is True where two modules are mutually excluded
+        self.mutual_exclusions = np.zeros((self.n_modules, self.n_modules), dtype=bool)
+        for m_idx, m in enumerate(self.modules):
+            self.mutual_exclusions[m_idx, [module_idxs[e] for e in m.mutual_exclusions]] = True
+        self.mutual_exclusions |= self.mutual_exclusions.T
+
+        # Indices of the modules in each group, in the order in which they appear in the module list
+        self.group_module_idxs = [np.flatnonzero(self.group_idxs == g_idx) for g_idx in range(len(self.module_groups))]
+        self.modules_per_group = np.bincount(self.group_idxs, minlength=len(self.module_groups))
+
+        # (# modules, # module groups) matrix which is 1 in the column of each module's group
+        self.group_incidence = np.zeros((self.n_modules, len(self.module_groups)), dtype=np.int64)
+        self.group_incidence[np.arange(self.n_modules), self.group_idxs] = 1
+
+        # Credits of each module in the column of its group/semester, one row per module
+        self.group_credits = np.zeros((self.n_modules, len(self.module_groups)), dtype=np.int64)
+        self.group_credits[np.arange(self.n_modules), self.group_idxs] = self.credits
+        self.semester_credits = np.zeros((self.n_modules, len(self.semesters)), dtype=np.int64)
+        self.semester_credits[np.arange(self.n_modules), self.semester_idxs] = self.credits
+
+        # Credits of each module in the columns of its group, its semester and the total, so that every credit total
+        # of many students is given by one product with their (# students, # modules) assignment matrix
+        self.credit_incidence = np.concatenate([self.group_credits, self.semester_credits, self.credits[:, None]], axis=1)
+
+        # The "bundle" of each module is the module itself followed by all of its direct and indirect requirements,
+        # padded (with masked-out repeats of the module index) to a common width so that the bundles of many
+        # candidate modules can be evaluated together as one 2d array
+        bundles = [[m_idx] + [module_idxs[r] for r in m.get_all_requirements()] for m_idx, m in enumerate(self.modules)]
+        bundle_width = max([len(b) for b in bundles], default=1)
+        self.bundle_idxs = np.array([b + [b[0]] * (bundle_width - len(b)) for b in bundles], dtype=np.intp).reshape(self.n_modules, bundle_width)
+        self.bundle_mask = np.array([[True] * len(b) + [False] * (bundle_width - len(b)) for b in bundles], dtype=bool).reshape(self.n_modules, bundle_width)
+
+        # Total credits per group/semester of each module's bundle, if none of the bundle has been assigned yet
+        self.bundle_group_credits = np.sum(self.group_credits[self.bundle_idxs] * self.bundle_mask[:, :, None], axis=1)
+        self.bundle_semester_credits = np.sum(self.semester_credits[self.bundle_idxs] * self.bundle_mask[:, :, None], axis=1)
+
+        for a in [self.credits, self.group_idxs, self.semester_idxs, self.total_spaces, self.available_spaces, self.mutual_exclusions,
+                  *self.group_module_idxs, self.modules_per_group, self.group_incidence, self.group_credits, self.semester_credits, self.credit_incidence, self.bundle_idxs, self.bundle_mask,
+                  self.bundle_group_credits, self.bundle_semester_credits]:
+            a.flags.writeable = False
+
+    def __len__(self) -> int:
+        return self.n_modules
+
+
+def _read_only(a:np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+def _get_satisfaction_scores(rank_sums:np.ndarray, counts:np.ndarray, modules_per_group:np.ndarray) -> np.ndarray:
+    """Get satisfaction scores (see AssignmentResult.get_assignment_satisfaction_scores) from the sum of the
+    rankings and the number of the modules assigned to each student in each group
+
+    Args:
+        rank_sums (np.ndarray): A (# students, # module groups) array of the sums of the assigned modules' rankings
+        counts (np.ndarray): A (# students, # module groups) array of the numbers of assigned modules
+        modules_per_group (np.ndarray): The number of modules in each group
+
+    Returns:
+        np.ndarray: An array of shape (# students, # module groups) containing satisfaction scores
+    """
+    # The best possible sum of k rankings is 1 + ... + k, and the worst is (n - k + 1) + ... + n
+    # for a group of n modules
+    best = counts * (counts + 1) / 2
+    worst = counts * (2 * modules_per_group - counts + 1) / 2
+
+    # Scores are undefined (NaN) for groups in which a student was assigned no modules or every module
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 1 - ((rank_sums - best) / (worst - best))
+
+
+class DenseModuleAssignments:
+    """The modules assigned to each student, stored as a (# students, # modules) boolean array.
+    This is the fastest layout, but needs memory for every pair of a student and a module.
+    """
+    layout = "dense"
+
+    def __init__(self, n_students:int, n_modules:int, modules_per_student:int = None):
+        """
+        Args:
+            n_students (int): The number of students
+            n_modules (int): The number of modules
+            modules_per_student (int, optional): The expected number of modules assigned to each student (unused)
+        """
+        self.n_students = n_students
+        self.n_modules = n_modules
+        self.assigned = np.zeros((n_students, n_modules), dtype=bool)
 
-        # Random state for choosing student permutations
-        self._random_seed = random_seed
-        self._rs = np.random.RandomState(random_seed)
+    @classmethod
+    def from_array(cls, assigned:np.ndarray) -> Self:
+        assignments = cls(*assigned.shape)
+        assignments.assigned[:] = assigned
+        return assignments
 
-    def set_loaded_module_assignments(self, data:pd.DataFrame):
-        """Load the previously assigned modules for each student
-        from the given dataframe
+    @staticmethod
+    def estimate_nbytes(n_students:int, n_modules:int, modules_per_student:int) -> int:
+        return n_students * n_modules
+
+    @property
+    def nbytes(self) -> int:
+        return self.assigned.nbytes
+
+    def add(self, student_idx:int, module_idx:int) -> bool:
+        """Assign a module to a student
+
+        Returns:
+            bool: True iff the module was not already assigned to the student
+        """
+        if self.assigned[student_idx, module_idx]:
+            return False
+        self.assigned[student_idx, module_idx] = True
+        return True
+
+    def get_student_row(self, student_idx:int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A (# modules) boolean array which is True for the modules assigned to the student
+        """
+        return self.assigned[student_idx]
+
+    def get_student_rows(self, student_idxs:np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A (# given students, # modules) boolean array which is True for the modules assigned to each student
+        """
+        return self.assigned[student_idxs]
+
+    def get_student_modules(self, student_idx:int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The indices of the modules assigned to the student, in increasing order
+        """
+        return np.flatnonzero(self.assigned[student_idx])
+
+    def nonzero(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (np.ndarray, np.ndarray): The student and module indices of every assignment, ordered by student and then module
+        """
+        return np.nonzero(self.assigned)
+
+    def dot(self, matrix:np.ndarray, weights:np.ndarray = None) -> np.ndarray:
+        """Multiply the (# students, # modules) assignment matrix by another matrix
 
         Args:
-            data (pd.DataFrame): A data frame containing a column of student IDs, and columns for each module, where a non-zero entry in the latter columns indicates that the student was assigned to that module
+            matrix (np.ndarray): A (# modules, k) matrix
+            weights (np.ndarray, optional): A (# students, # modules) array of values to use in place of
+                the 1s of the assignment matrix. Defaults to None.
+
+        Returns:
+            np.ndarray: The (# students, k) floating point product
         """
+        assigned = self.assigned if weights is None else np.where(self.assigned, weights, 0)
+        return assigned.astype(np.float64) @ matrix
+
+    def to_dense(self) -> np.ndarray:
+        return self.assigned.copy()
+
+    def freeze(self) -> Self:
+        """
+        Returns:
+            DenseModuleAssignments: A read-only copy of the assignments
+        """
+        frozen = self.from_array(self.assigned)
+        _read_only(frozen.assigned)
+        return frozen
 
-        for s_idx, s in enumerate(self._students):
-            student_data = data[(data.student_id == s.id)]
-            for mg_idx, mg in enumerate(self._grouped_modules):
-                for m_idx, m in enumerate(mg):
-                    if student_data[m.module_id].values[0] > 0:
-                        self._student_assigned_credits[mg_idx][s_idx][m_idx] = m.credits
 
+class SparseModuleAssignments:
+    """The modules assigned to each student, stored as a fixed-width list of module indices per student,
+    in increasing order and padded with -1. The lists are widened whenever a student is assigned more
+    modules than fit, so memory stays proportional to the number of modules assigned per student.
+    """
+    layout = "sparse"
+
+    def __init__(self, n_students:int, n_modules:int, modules_per_student:int = 1):
+        """
+        Args:
+            n_students (int): The number of students
+            n_modules (int): The number of modules
+            modules_per_student (int, optional): The expected number of modules assigned to each student, which
+                is the initial width of the lists. Defaults to 1.
+        """
+        self.n_students = n_students
+        self.n_modules = n_modules
+        self.module_idxs = np.full((n_students, max(modules_per_student, 1)), -1, dtype=np.int32)
+        self.counts = np.zeros(n_students, dtype=np.int32)
 
+    @staticmethod
+    def estimate_nbytes(n_students:int, n_modules:int, modules_per_student:int) -> int:
+        return n_students * (modules_per_student + 1) * np.dtype(np.int32).itemsize
+
+    @property
+    def nbytes(self) -> int:
+        return self.module_idxs.nbytes + self.counts.nbytes
+
+    def add(self, student_idx:int, module_idx:int) -> bool:
+        """Assign a module to a student
+
+        Returns:
+            bool: True iff the module was not already assigned to the student
+        """
+        count = self.counts[student_idx]
+        row = self.module_idxs[student_idx]
+        position = np.searchsorted(row[:count], module_idx)
+        if position < count and row[position] == module_idx:
+            return False
+        if count == self.module_idxs.shape[1]:
+            self.module_idxs = np.concatenate([self.module_idxs, np.full_like(self.module_idxs, -1)], axis=1)
+            row = self.module_idxs[student_idx]
+        row[position + 1:count + 1] = row[position:count].copy()
+        row[position] = module_idx
+        self.counts[student_idx] += 1
+        return True
+
+    def get_student_row(self, student_idx:int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A (# modules) boolean array which is True for the modules assigned to the student
+        """
+        row = np.zeros(self.n_modules, dtype=bool)
+        row[self.get_student_modules(student_idx)] = True
+        return row
+
+    def get_student_rows(self, student_idxs:np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A (# given students, # modules) boolean array which is True for the modules assigned to each student
+        """
+        module_idxs = self.module_idxs[student_idxs]
+        rows = np.zeros((len(module_idxs), self.n_modules), dtype=bool)
+        assigned = module_idxs >= 0
+        rows[np.nonzero(assigned)[0], module_idxs[assigned]] = True
+        return rows
+
+    def get_student_modules(self, student_idx:int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The indices of the modules assigned to the student, in increasing order
+        """
+        return self.module_idxs[student_idx, :self.counts[student_idx]]
+
+    def nonzero(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (np.ndarray, np.ndarray): The student and module indices of every assignment, ordered by student and then module
+        """
+        assigned = self.module_idxs >= 0
+        return np.nonzero(assigned)[0], self.module_idxs[assigned].astype(np.intp)
+
+    def dot(self, matrix:np.ndarray, weights:np.ndarray = None) -> np.ndarray:
+        """Multiply the (# students, # modules) assignment matrix by another matrix
+
+        Args:
+            matrix (np.ndarray): A (# modules, k) matrix
+            weights (np.ndarray, optional): A (# students, # modules) array of values to use in place of
+                the 1s of the assignment matrix. Defaults to None.
+
+        Returns:
+            np.ndarray: The (# students, k) floating point product
+        """
+        student_idxs, module_idxs = self.nonzero()
+        values = matrix[module_idxs].astype(np.float64)
+        if weights is not None:
+            values *= weights[student_idxs, module_idxs][:, None]
+        product = np.zeros((self.n_students, matrix.shape[1]), dtype=np.float64)
+        for k in range(matrix.shape[1]):
+            product[:, k] = np.bincount(student_idxs, weights=values[:, k], minlength=self.n_students)
+        return product
+
+    def to_dense(self) -> np.ndarray:
+        return self.get_student_rows(np.arange(self.n_students))
+
+    def freeze(self) -> Self:
+        """
+        Returns:
+            SparseModuleAssignments: A read-only copy of the assignments, with the lists only as wide as needed
+        """
+        frozen = SparseModuleAssignments(self.n_students, self.n_modules, int(np.max(self.counts, initial=0)))
+        frozen.module_idxs[:] = self.module_idxs[:, :frozen.module_idxs.shape[1]]
+        frozen.counts[:] = self.counts
+        _read_only(frozen.module_idxs)
+        _read_only(frozen.counts)
+        return frozen
+
+
+MODULE_ASSIGNMENT_LAYOUTS = {c.layout: c for c in [DenseModuleAssignments, SparseModuleAssignments]}
+
+
+def create_module_assignments(n_students:int, n_modules:int, modules_per_student:int, layout:str = None) -> DenseModuleAssignments | SparseModuleAssignments:
+    """Create an empty store of the modules assigned to each student
+
+    Args:
+        n_students (int): The number of students
+        n_modules (int): The number of modules
+        modules_per_student (int): The expected number of modules assigned to each student
+        layout (str, optional): "dense" or "sparse". Defaults to None, to use the sparse layout if it is estimated
+            to need at most a quarter of the memory of the (faster) dense layout.
+
+    Returns:
+        DenseModuleAssignments | SparseModuleAssignments: The empty assignments
+    """
+    if layout is None:
+        sparse_nbytes = SparseModuleAssignments.estimate_nbytes(n_students, n_modules, modules_per_student)
+        dense_nbytes = DenseModuleAssignments.estimate_nbytes(n_students, n_modules, modules_per_student)
+        layout = "sparse" if 4 * sparse_nbytes <= dense_nbytes else "dense"
+    if layout not in MODULE_ASSIGNMENT_LAYOUTS:
+        raise ValueError(f"Unknown module assignment layout '{layout}'")
+    return MODULE_ASSIGNMENT_LAYOUTS[layout](n_students, n_modules, modules_per_student)
+
+
+class ConstraintReport:
+    """Which of the credit constraints are satisfied by an assignment, for each student. All of the
+    students' credit totals are computed at once, from the modules' credit incidence matrix.
+    """
+
+    def __init__(self, assignments:DenseModuleAssignments | SparseModuleAssignments, modules:ModuleCatalogue, required_credits_per_student:int, max_credits_per_group:list[int], max_credits_per_semester:list[int], min_credits_per_group:list[int], min_credits_per_semester:list[int]):
+        """
+        Args:
+            assignments (DenseModuleAssignments | SparseModuleAssignments): The modules assigned to each student
+            modules (ModuleCatalogue): The modules
+            required_credits_per_student (int): The number of credits each student should be assigned
+            max_credits_per_group (list[int]): The maximum number of credits per student in each of modules.module_groups
+            max_credits_per_semester (list[int]): The maximum number of credits per student in each of modules.semesters
+            min_credits_per_group (list[int]): The minimum number of credits per student in each of modules.module_groups
+            min_credits_per_semester (list[int]): The minimum number of credits per student in each of modules.semesters
+        """
+        self.module_groups = modules.module_groups
+        self.semesters = modules.semesters
+
+        # Credit totals are small integers, so the (much faster) floating point product is exact
+        n_groups = len(self.module_groups)
+        n_semesters = len(self.semesters)
+        credit_totals = assignments.dot(modules.credit_incidence).astype(np.int64)
+        self.credits_per_group = _read_only(credit_totals[:, :n_groups])
+        self.credits_per_semester = _read_only(credit_totals[:, n_groups:n_groups + n_semesters])
+        self.total_credits = _read_only(credit_totals[:, -1])
+
+        self.min_credits_per_group_satisfied = _read_only(self.credits_per_group >= min_credits_per_group)
+        self.max_credits_per_group_satisfied = _read_only(self.credits_per_group <= max_credits_per_group)
+        self.min_credits_per_semester_satisfied = _read_only(self.credits_per_semester >= min_credits_per_semester)
+        self.max_credits_per_semester_satisfied = _read_only(self.credits_per_semester <= max_credits_per_semester)
+        self.required_credits_satisfied = _read_only(self.total_credits == required_credits_per_student)
+
+        # Whether every student has the required number of credits, and the minimum number of credits in each
+        # module group and semester. The maxima are only reported above: the assignment rounds exceed the maximum
+        # credits per group when they relax it, and loaded assignments may exceed any maximum.
+        self.students_satisfied = _read_only(self.required_credits_satisfied
+                                             & np.all(self.min_credits_per_group_satisfied, axis=1)
+                                             & np.all(self.min_credits_per_semester_satisfied, axis=1))
+        self.all_satisfied = bool(np.all(self.students_satisfied))
+
+    def get_summary(self):
+        """Get a table of which credit constraints are satisfied for each student
+
+        Returns:
+            pd.DataFrame: One boolean column per constraint, with one row per student
+        """
+        columns = dict()
+        columns.update({f"min_credits_per_semester_satisfied_{l}": self.min_credits_per_semester_satisfied[:, i] for i, l in enumerate(self.semesters)})
+        columns.update({f"max_credits_per_semester_not_exceeded_{l}": self.max_credits_per_semester_satisfied[:, i] for i, l in enumerate(self.semesters)})
+        columns.update({f"min_credits_per_group_satisfied_{l}": self.min_credits_per_group_satisfied[:, i] for i, l in enumerate(self.module_groups)})
+        columns.update({f"max_credits_per_group_not_exceeded_{l}": self.max_credits_per_group_satisfied[:, i] for i, l in enumerate(self.module_groups)})
+        columns["required_credits_total_satisfied"] = self.required_credits_satisfied
+        return pd.DataFrame(columns)
+
+
+class AssignmentResult:
+    """An immutable snapshot of an assignment of students to modules, with the
+    metrics used to compare it to other assignments. Metrics are only computed
+    once, when they are first needed. The students and modules are shared, not
+    copied, so many results can be kept at little cost.
+    """
+
+    def __init__(self, students:StudentCohort, modules:ModuleCatalogue, required_credits_per_student:int, max_credits_per_group:list[int], max_credits_per_semester:list[int], min_credits_per_group:list[int], min_credits_per_semester:list[int], assigned_modules:np.ndarray | DenseModuleAssignments | SparseModuleAssignments, module_spaces_remaining:np.ndarray, module_spaces_excess_requests:np.ndarray, repetition:int = None, n_rounds:int = None, satisfaction_scores:np.ndarray = None):
+        """
+        Args:
+            students (StudentCohort): The students
+            modules (ModuleCatalogue): The modules
+            required_credits_per_student (int): The number of credits each student should be assigned
+            max_credits_per_group (list[int]): The maximum number of credits per student in each of modules.module_groups
+            max_credits_per_semester (list[int]): The maximum number of credits per student in each of modules.semesters
+            min_credits_per_group (list[int]): The minimum number of credits per student in each of modules.module_groups
+            min_credits_per_semester (list[int]): The minimum number of credits per student in each of modules.semesters
+            assigned_modules (np.ndarray | DenseModuleAssignments | SparseModuleAssignments): The modules assigned to each
+                student, either as a (# students, # modules) boolean array which is True where a module is assigned to a
+                student, or in either layout of a module assigner
+            module_spaces_remaining (np.ndarray): The number of spaces remaining on each module
+            module_spaces_excess_requests (np.ndarray): The number of excess requests for each module
+            repetition (int, optional): Index of the repetition of a search which produced the assignment
+            n_rounds (int, optional): The number of assignment rounds which were run
+            satisfaction_scores (np.ndarray, optional): The satisfaction scores of the assignment, if already known.
+                Defaults to None, to compute them from the assignment when they are first needed.
+        """
+        self.required_credits_per_student = required_credits_per_student
+        self.max_credits_per_group = list(max_credits_per_group)
+        self.max_credits_per_semester = list(max_credits_per_semester)
+        self.min_credits_per_group = list(min_credits_per_group)
+        self.min_credits_per_semester = list(min_credits_per_semester)
+        if isinstance(assigned_modules, np.ndarray):
+            assigned_modules = DenseModuleAssignments.from_array(np.asarray(assigned_modules, dtype=bool))
+        self.assignments = assigned_modules.freeze()
+        self.module_spaces_remaining = _read_only(np.array(module_spaces_remaining))
+        self.module_spaces_excess_requests = _read_only(np.array(module_spaces_excess_requests))
+        self.repetition = repetition
+        self.n_rounds = n_rounds
+        if satisfaction_scores is not None:
+            self.satisfaction_scores = _read_only(np.array(satisfaction_scores, dtype=np.float64))
+        self._attach(students, modules)
+
+    def _attach(self, students:StudentCohort, modules:ModuleCatalogue):
+        """Set the students and modules of the assignment. Results sent between processes are detached from their
+        students and modules, which are shared by every result of a search, and attached again when received.
+        """
+        self.students = students
+        self.modules = modules
+        self._student_module_rankings = None
+        if students is not None and modules is not None:
+            self._student_module_rankings = ModuleAssigner._get_cohort_columns(students.module_rankings, students.get_module_columns(modules.module_ids), StudentCohort.UNRANKED)
+
+    def _detach(self) -> Self:
+        self._attach(None, None)
+        self.__dict__.pop("constraint_report", None)
+        return self
+
+    @cached_property
+    def mean_satisfaction_score(self) -> float:
+        """The mean satisfaction score over all students and module groups, ignoring undefined scores"""
+        return float(np.nanmean(self.satisfaction_scores))
+
+    @cached_property
+    def mean_proportion_overrequested(self) -> float:
+        """The mean over all modules of the number of excess requests for the module, as a proportion of its capacity"""
+        return float(np.mean(self.module_spaces_excess_requests / self.modules.total_spaces))
+
+    @cached_property
+    def constraint_report(self) -> ConstraintReport:
+        """Which of the credit constraints are satisfied, for each student"""
+        return ConstraintReport(self.assignments, self.modules, self.required_credits_per_student, self.max_credits_per_group,
+                                self.max_credits_per_semester, self.min_credits_per_group, self.min_credits_per_semester)
+
+    @cached_property
+    def constraints_satisfied(self) -> bool:
+        """Whether every student has the required number of credits, and the minimum number of credits in each
+        module group and semester"""
+        return self.constraint_report.all_satisfied
+
+    def is_better_than(self, other:Self) -> bool:
+        """Whether this assignment should replace another as the best assignment found so far.
+        Later repetitions replace earlier ones with the same mean satisfaction score.
+
+        Args:
+            other (AssignmentResult): The best assignment found so far, or None
+
+        Returns:
+            bool: True iff this assignment is better
+        """
+        return other is None or self.mean_satisfaction_score >= other.mean_satisfaction_score
+
+    @property
+    def assigned_modules(self) -> np.ndarray:
+        """A (# students, # modules) boolean array which is True where a module is assigned to a student"""
+        return _read_only(self.assignments.to_dense())
+
+    @property
+    def assigned_credits_per_group(self) -> np.ndarray:
+        """The number of credits assigned to each student in each module group, in an array of shape (# students, # module groups)"""
+        return self.constraint_report.credits_per_group
+
+    @property
+    def assigned_credits_per_semester(self) -> np.ndarray:
+        """The number of credits assigned to each student in each semester, in an array of shape (# students, # semesters)"""
+        return self.constraint_report.credits_per_semester
 
     def get_module_dataframe(self):
         """Get a Pandas DataFrame containing the module metadata (ids, names, capacity, etc),
@@ -107,14 +650,14 @@ class ModuleAssigner:
         data["required_modules"] = []
         data["mutually_excluded_modules"] = []
 
-        for module in self._modules:
+        for m_idx, module in enumerate(self.modules.modules):
             data["module_id"] += [module.module_id]
             data["module_name"] += [module.module_name]
             data["module_group"] += [module.group]
             data["semester"] += [module.semester]
             data["credits"] += [module.credits]
             data["capacity"] += [module.total_spaces]
-            data["available_spaces"] += [module.available_spaces]
+            data["available_spaces"] += [self.module_spaces_remaining[m_idx]]
             data["required_modules"] += [",".join([m.module_id for m in module.requirements])]
             data["mutually_excluded_modules"] += [",".join([m.module_id for m in module.mutual_exclusions])]
 
@@ -126,7 +669,7 @@ class ModuleAssigner:
         Returns:
             np.ndarray: An array of integers representing the total numbers of credits assigned to each student
         """
-        return np.sum(np.array(list(map(lambda a: np.sum(a, axis=1), self._student_assigned_credits))).T, axis=1)
+        return self.constraint_report.total_credits
 
 
     def get_assigned_modules_totals(self):
@@ -135,7 +678,7 @@ class ModuleAssigner:
         Returns:
             np.ndarray: An array of integers representing the total numbers of modules assigned to each student
         """
-        return np.sum(np.array(list(map(lambda a: np.sum(a != 0, axis=1), self._student_assigned_credits))).T, axis=1)
+        return np.bincount(self.assignments.nonzero()[0], minlength=self.assignments.n_students)
     
 
     def get_assigned_modules(self, selected_student_id:str):
@@ -148,49 +691,57 @@ class ModuleAssigner:
         Returns:
             List[Module]: A list of references to the modules assigned to the given student
         """
-        s_idx = self._student_ids.index(selected_student_id)
-        assigned_modules:list[Module] = []
-        for g_idx, group in enumerate(self._student_assigned_credits):
-            for m_idx in np.nonzero(group[s_idx])[0]:
-                assigned_modules += [self._grouped_modules[g_idx][m_idx]]
-        return assigned_modules
+        s_idx = self.students.ids.index(selected_student_id)
+        return [self.modules.modules[m_idx] for m_idx in self.assignments.get_student_modules(s_idx)]
     
     def get_all_assigned_modules(self):
-        student_names = [s.name for s in self._students]
-        student_ids = [s.id for s in self._students]
-
-        names_ids_df = pd.DataFrame({"student_name":student_names, "student_id":student_ids})
-        student_module_group_preferences_df = pd.DataFrame([s.preferred_modules_per_group for s in self._students])
-        module_allocations_df = pd.DataFrame(columns=[m.module_id for m in self._modules])        
-        
-        for s_idx, s in enumerate(self._students):
-            assigned_modules = self.get_assigned_modules(s.id)
-            new_row = {m.module_id: s.module_rankings_by_id[m.module_id] if m in assigned_modules else 0 for m in self._modules}
-            module_allocations_df.loc[s_idx] = new_row
+        """Get a table of the modules assigned to each student
 
+        Returns:
+            pd.DataFrame: The student names and IDs, the students' preferred numbers of modules per group, and one column
+            per module containing the student's ranking of the module if it was assigned to them, or 0 otherwise
+        """
+        names_ids_df = self.get_students_list()
+        student_module_group_preferences_df = pd.DataFrame(self.students.preferred_modules_per_group, columns=self.students.module_groups)
+        student_idxs, module_idxs = self.assignments.nonzero()
+        assigned_rankings = np.zeros((self.assignments.n_students, self.assignments.n_modules), dtype=self._student_module_rankings.dtype)
+        assigned_rankings[student_idxs, module_idxs] = self._student_module_rankings[student_idxs, module_idxs]
+        module_allocations_df = pd.DataFrame(assigned_rankings, columns=self.modules.module_ids)
         return pd.concat([names_ids_df, student_module_group_preferences_df, module_allocations_df], axis=1)
-    
+
     def get_students_list(self):
-        student_names = [s.name for s in self._students]
-        student_ids = [s.id for s in self._students]
-        names_ids_df = pd.DataFrame({"student_name":student_names, "student_id":student_ids})
-        return names_ids_df
+        return pd.DataFrame({"student_name":self.students.names, "student_id":self.students.ids})
+
+    @cached_property
+    def module_rosters(self) -> tuple[np.ndarray, np.ndarray]:
+        """The students assigned to each module, in compressed sparse row form: the indices of the students
+        assigned to module m_idx, in order, are student_idxs[roster_starts[m_idx]:roster_starts[m_idx + 1]]
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: roster_starts (# modules + 1) and student_idxs (# assignments)
+        """
+        student_idxs, module_idxs = self.assignments.nonzero()
+        order = np.argsort(module_idxs, kind="stable")
+        student_idxs = student_idxs[order]
+        roster_starts = np.zeros(self.modules.n_modules + 1, dtype=np.intp)
+        np.cumsum(np.bincount(module_idxs, minlength=self.modules.n_modules), out=roster_starts[1:])
+        return _read_only(roster_starts), _read_only(np.asarray(student_idxs, dtype=np.intp))
 
     def get_assigned_module_students(self):
-        module_ids = []
+        """Get the students assigned to each module
+
+        Returns:
+            (list[str], list[pd.DataFrame]): The module IDs, and a table of the names and IDs of the students assigned to each module
+        """
+        roster_starts, student_idxs = self.module_rosters
+        names = np.array(self.students.names, dtype=object)[student_idxs]
+        ids = np.array(self.students.ids, dtype=object)[student_idxs]
+
         assigned_student_dfs = []
-        for m in self._modules:
-            students_for_current_module:list[Student] = []
-            for s in self._students:
-                assigned_modules = self.get_assigned_modules(s.id)
-                if m in assigned_modules:
-                    students_for_current_module.append(s)
-            
-            df = pd.DataFrame({"student_name":[s.name for s in students_for_current_module], "student_id":[s.id for s in students_for_current_module]})
-            module_ids.append(m.module_id)
-            assigned_student_dfs.append(df)
-
-        return module_ids, assigned_student_dfs
+        for start, end in zip(roster_starts[:-1], roster_starts[1:]):
+            assigned_student_dfs.append(pd.DataFrame({"student_name":names[start:end], "student_id":ids[start:end]}))
+
+        return list(self.modules.module_ids), assigned_student_dfs
 
     def get_assignment_satisfaction_scores(self):
         """Get the per-participant, per-module-group satisfaction scores.
@@ -204,42 +755,21 @@ class ModuleAssigner:
         Returns:
             np.ndarray: An array of shape (# students, # module groups) containing satisfaction scores
         """
-        modules_per_group = np.zeros(len(self._unique_module_groups))
-        for m in self._modules:
-            g_idx = self._unique_module_groups.index(m.group)
-            modules_per_group[g_idx] += 1
-
-        scores = []
-        best = []
-        worst = []
-        for s in self._students:
-            per_group_assignment_counts = np.zeros(len(self._unique_module_groups))
-            ideal_per_group_pref_scores = np.zeros(len(self._unique_module_groups))
-            worst_per_group_pref_scores = np.zeros(len(self._unique_module_groups))
-            per_group_pref_scores = np.zeros(len(self._unique_module_groups))
-            assigned_modules = self.get_assigned_modules(s.id)
-
-            for m in assigned_modules:
-                g_idx = self._unique_module_groups.index(m.group)
-                per_group_pref_scores[g_idx] += s.module_rankings_by_id[m.module_id]
-                per_group_assignment_counts[g_idx] += 1
-
-            for g_id in self._unique_module_groups:
-                g_idx = self._unique_module_groups.index(g_id)
-                ideal_per_group_pref_scores[g_idx] = np.sum(np.arange(per_group_assignment_counts[g_idx]) + 1)
-                worst_per_group_pref_scores[g_idx] = np.sum(np.arange(modules_per_group[g_idx] - per_group_assignment_counts[g_idx], modules_per_group[g_idx]) + 1)
-
-            scores += [per_group_pref_scores]
-            best += [ideal_per_group_pref_scores]
-            worst += [worst_per_group_pref_scores]      
-
-        return 1 - ((np.stack(scores) - np.stack(best)) / (np.stack(worst) - np.stack(best)))
+        return self.satisfaction_scores
+
+    @cached_property
+    def satisfaction_scores(self) -> np.ndarray:
+        """The satisfaction scores returned by get_assignment_satisfaction_scores"""
+        # Sum of the rankings and number of the modules assigned to each student in each group
+        rank_sums = self.assignments.dot(self.modules.group_incidence, self._student_module_rankings)
+        counts = self.assignments.dot(self.modules.group_incidence)
+        return _read_only(_get_satisfaction_scores(rank_sums, counts, self.modules.modules_per_group))
 
     def get_excess_module_requests(self):
-        module_ids = [m.module_id for m in self._modules]
-        module_names = [m.module_name for m in self._modules]
-        excess_requests = [self._module_spaces_excess_requests[m] for m in self._modules]
-        proportion_overrequested = [self._module_spaces_excess_requests[m] / m.total_spaces for m in self._modules]
+        module_ids = [m.module_id for m in self.modules.modules]
+        module_names = [m.module_name for m in self.modules.modules]
+        excess_requests = list(self.module_spaces_excess_requests)
+        proportion_overrequested = [self.module_spaces_excess_requests[m_idx] / m.total_spaces for m_idx, m in enumerate(self.modules.modules)]
         return pd.DataFrame({"module_id":module_ids, "module_name":module_names, "excess_requests":excess_requests, "proportion_overrequested":proportion_overrequested})
 
     def assignment_satisfies_minimum_credits_per_group(self):
@@ -247,35 +777,458 @@ class ModuleAssigner:
         Returns:
             boolean: True iff the assignment of students to modules meets the minimum number of credits per module group for all students
         """
-        return np.array(list(map(lambda a: np.sum(a, axis=1), self._student_assigned_credits))).T >= self._min_credits_per_group, self._unique_module_groups
+        return self.constraint_report.min_credits_per_group_satisfied, self.modules.module_groups
     
     def assignment_satisfies_maximum_credits_per_group(self):
         """
         Returns:
             boolean: True iff the assignment of students to modules meets the maximum number of credits per module group for all students
         """
-        return np.array(list(map(lambda a: np.sum(a, axis=1), self._student_assigned_credits))).T <= self._max_credits_per_group, self._unique_module_groups
+        return self.constraint_report.max_credits_per_group_satisfied, self.modules.module_groups
     
     def assignment_satisfies_minimum_credits_per_semester(self):
         """        
         Returns:
             boolean: True iff the assignment of students to modules meets the minimum number of credits per semester for all students
         """
-        credits_per_semester = np.stack([np.sum(np.stack([np.sum(np.stack([self._student_assigned_credits[g_idx][:, m_idx] for m_idx, m in enumerate(g) if m.semester == s]), axis=0) for g_idx, g in enumerate(self._grouped_modules)]), axis=0) for s in self._unique_semesters]).T
-        return credits_per_semester >= self._min_credits_per_semester, self._unique_semesters
+        return self.constraint_report.min_credits_per_semester_satisfied, self.modules.semesters
 
     def assignment_satisfies_maximum_credits_per_semester(self):
         """        
         Returns:
             boolean: True iff the assignment of students to modules meets the maximum number of credits per semester for all students
         """
-        credits_per_semester = np.stack([np.sum(np.stack([np.sum(np.stack([self._student_assigned_credits[g_idx][:, m_idx] for m_idx, m in enumerate(g) if m.semester == s]), axis=0) for g_idx, g in enumerate(self._grouped_modules)]), axis=0) for s in self._unique_semesters]).T
-        return credits_per_semester <= self._max_credits_per_semester, self._unique_semesters
+        return self.constraint_report.max_credits_per_semester_satisfied, self.modules.semesters
+
+
+class ModuleAssigner:
+    def __init__(self, students:list[Student] | StudentCohort, modules:list[Module] | ModuleCatalogue, required_credits_per_student:int, max_credits_per_group:dict[str, int], max_credits_per_semester:dict[str, int], min_credits_per_group:dict[str, int], min_credits_per_semester:dict[str, int], random_seed:int | np.random.SeedSequence, assignment_layout:str = None):
+        # The students and modules are shared (not copied) between assigners, and must not be modified
+        self._cohort = students if isinstance(students, StudentCohort) else StudentCohort.from_students(students)
+        self._n_students = self._cohort.n_students
+        self._students = self._cohort.students
+        self._student_ids = self._cohort.ids
+        self._catalogue = modules if isinstance(modules, ModuleCatalogue) else ModuleCatalogue(modules)
+        self._modules = self._catalogue.modules
+        self._n_modules = self._catalogue.n_modules
+        self._required_credits_per_student = required_credits_per_student
+        self._unique_module_groups = self._catalogue.module_groups
+        self._unique_semesters = self._catalogue.semesters
+
+        # Compiled, integer-indexed representation of the modules, so that the assignment rounds never
+        # need to search lists of Module objects. Module indices refer to positions in self._modules.
+        self._module_credits = self._catalogue.credits
+        self._module_group_idxs = self._catalogue.group_idxs
+        self._module_semester_idxs = self._catalogue.semester_idxs
+        self._module_mutual_exclusions = self._catalogue.mutual_exclusions
+        self._group_module_idxs = self._catalogue.group_module_idxs
+        self._module_group_credits = self._catalogue.group_credits
+        self._module_semester_credits = self._catalogue.semester_credits
+        self._module_bundle_idxs = self._catalogue.bundle_idxs
+        self._module_bundle_mask = self._catalogue.bundle_mask
+        self._module_bundle_group_credits = self._catalogue.bundle_group_credits
+        self._module_bundle_semester_credits = self._catalogue.bundle_semester_credits
+
+        # One row per student, one column per module. Unranked modules have a ranking of StudentCohort.UNRANKED.
+        module_columns = self._cohort.get_module_columns(self._catalogue.module_ids)
+        self._student_module_rankings = self._get_cohort_columns(self._cohort.module_rankings, module_columns, StudentCohort.UNRANKED)
+        self._student_module_grouped_preferences = [self._student_module_rankings[:, idxs] for idxs in self._group_module_idxs]
+
+        # Which modules have the lowest possible preference (i.e. largest preference rating) in their group, for each student
+        self._student_least_preferred_modules = np.zeros((self._n_students, self._n_modules), dtype=bool)
+        for idxs, prefs in zip(self._group_module_idxs, self._student_module_grouped_preferences):
+            self._student_least_preferred_modules[:, idxs] = prefs == np.max(prefs, axis=1, keepdims=True)
+        # For each group, a (# students, # modules in group) array of module indices in each student's order of
+        # preference. Modules are removed from these arrays as soon as they are full, so that they are never
+        # considered again. These arrays and the preference positions below have one entry per student and module,
+        # so they use the smallest integer type that holds a module index.
+        module_idx_dtype = np.int16 if self._n_modules <= np.iinfo(np.int16).max else np.int32
+        self._student_group_module_orders = [idxs.astype(module_idx_dtype)[np.argsort(prefs, axis=1)] for idxs, prefs in zip(self._group_module_idxs, self._student_module_grouped_preferences)]
+
+        # The position of each module in the (original) order of preference of each student for the module's group
+        self._student_module_preference_positions = np.zeros((self._n_students, self._n_modules), dtype=module_idx_dtype)
+        for orders in self._student_group_module_orders:
+            self._student_module_preference_positions[np.arange(self._n_students)[:, None], orders] = np.arange(orders.shape[1])[None, :]
+
+        self._student_excluded_modules = self._get_cohort_columns(self._cohort.excluded_modules, module_columns, False)
+        group_columns = [self._cohort.module_groups.index(g) for g in self._unique_module_groups]
+        self._student_module_group_credit_preferences = self._get_cohort_columns(self._cohort.preferred_modules_per_group, np.array(group_columns, dtype=np.intp), 0)
+        self._max_credits_per_group = [max_credits_per_group[g_id] for g_id in self._unique_module_groups]
+        self._max_credits_per_semester = [max_credits_per_semester[i] for i in self._unique_semesters]
+        self._min_credits_per_group = [min_credits_per_group[g_id] for g_id in self._unique_module_groups]
+        self._min_credits_per_semester = [min_credits_per_semester[i] for i in self._unique_semesters]
+
+        # The modules assigned to each student. Each student is assigned only a few modules, so for large numbers of modules
+        # the assignments are stored sparsely (see create_module_assignments), unless assignment_layout says otherwise.
+        # TODO: Make it possible to load in how may credits the student has already been assigned
+        # Each student is expected to be assigned at most as many modules as the required credits allow with the smallest modules
+        smallest_credits = np.min(self._module_credits, where=self._module_credits > 0, initial=np.iinfo(np.int64).max)
+        modules_per_student = int(min(-(-self._required_credits_per_student // smallest_credits), self._n_modules))
+        self._assignments = create_module_assignments(self._n_students, self._n_modules, modules_per_student, assignment_layout)
+
+        # Running per-student totals, updated whenever a module is assigned so that the assignment
+        # rounds never need to rebuild them from the assignment matrix
+        self._student_credits_per_group = np.zeros((self._n_students, len(self._unique_module_groups)), dtype=np.int64)
+        self._student_credits_per_semester = np.zeros((self._n_students, len(self._unique_semesters)), dtype=np.int64)
+        self._student_mutually_excluded_modules = np.zeros((self._n_students, self._n_modules), dtype=bool)
+
+        # Running per-student sums of the rankings, and numbers, of the modules assigned in each group,
+        # from which the current satisfaction scores can be read at any time (see get_assignment_satisfaction_scores)
+        self._student_rank_sums_per_group = np.zeros((self._n_students, len(self._unique_module_groups)), dtype=np.int64)
+        self._student_modules_per_group = np.zeros((self._n_students, len(self._unique_module_groups)), dtype=np.int64)
+
+        # Students who can still be assigned modules. Students leave the active set once they have enough credits, or
+        # once no module can be assigned to them even with every constraint relaxed. Such "dead" students stay dead,
+        # since module spaces are only ever used up and their own assignments no longer change.
+        self._student_active = np.full(self._n_students, self._required_credits_per_student > 0)
+        self._student_dead = np.zeros(self._n_students, dtype=bool)
+
+        # Students who were loaded with a module but not all of its requirements (see set_loaded_module_assignments)
+        self._student_holds_incomplete_bundles = np.zeros(self._n_students, dtype=bool)
+
+        # Spaces remaining on each module
+        self._module_spaces_remaining = self._catalogue.available_spaces.copy()
+        for m_idx in np.flatnonzero(self._module_spaces_remaining <= 0):
+            self._remove_full_module(m_idx)
+
+        # Number of times the algorithm attempted to assign a student to each module
+        self._module_spaces_excess_requests = np.zeros(self._n_modules, dtype=np.int64)
+
+        # Random number generator for choosing student permutations. The seed may be a SeedSequence spawned
+        # for one of many independent assignments (see search.AssignmentSearch.get_random_seed).
+        self._random_seed = random_seed
+        self._rng = np.random.default_rng(random_seed)
+
+        # Snapshot of the current assignment for the getters (see _get_current_result), or None once it is out of date
+        self._current_result = None
+
+    @staticmethod
+    def _get_cohort_columns(data:np.ndarray, columns:np.ndarray, missing_value) -> np.ndarray:
+        """Select the given columns of a cohort array, without copying the array if the columns
+        are already in order. Columns with index -1 are filled with missing_value.
+        """
+        if len(columns) == data.shape[1] and np.array_equal(columns, np.arange(data.shape[1])):
+            return data
+        selected = data[:, columns]
+        selected[:, columns < 0] = missing_value
+        return selected
+
+    def _record_assignment(self, student_idx:int, module_idx:int) -> bool:
+        """Assign a module to a student, and update the running per-student totals.
+        This does not change the number of spaces remaining on the module.
+
+        Args:
+            student_idx (int): Index of the student in the students list
+            module_idx (int): Index of the module in the modules list
+
+        Returns:
+            bool: True iff the module was not already assigned to the student
+        """
+        if not self._assignments.add(student_idx, module_idx):
+            return False
+        self._current_result = None
+        credits = self._module_credits[module_idx]
+        group_idx = self._module_group_idxs[module_idx]
+        self._student_credits_per_group[student_idx, group_idx] += credits
+        self._student_credits_per_semester[student_idx, self._module_semester_idxs[module_idx]] += credits
+        self._student_mutually_excluded_modules[student_idx] |= self._module_mutual_exclusions[module_idx]
+        self._student_rank_sums_per_group[student_idx, group_idx] += self._student_module_rankings[student_idx, module_idx]
+        self._student_modules_per_group[student_idx, group_idx] += 1
+        if self._student_credits_per_group[student_idx].sum() >= self._required_credits_per_student:
+            self._student_active[student_idx] = False
+        return True
+
+    def set_loaded_module_assignments(self, data:pd.DataFrame):
+        """Load the previously assigned modules for each student
+        from the given dataframe
+
+        Args:
+            data (pd.DataFrame): A data frame containing a column of student IDs, and columns for each module, where a non-zero entry in the latter columns indicates that the student was assigned to that module
+        """
+
+        for s_idx, s in enumerate(self._students):
+            student_data = data[(data.student_id == s.id)]
+            for m_idx, m in enumerate(self._modules):
+                if student_data[m.module_id].values[0] > 0:
+                    self._record_assignment(s_idx, m_idx)
+            self._student_holds_incomplete_bundles[s_idx] = len(self._get_incomplete_bundle_module_idxs(s_idx)) > 0
+
+    def get_result(self, repetition:int = None, n_rounds:int = None) -> AssignmentResult:
+        """Get an immutable snapshot of the current assignment
+
+        Args:
+            repetition (int, optional): Index of the repetition of a search which produced the assignment
+            n_rounds (int, optional): The number of assignment rounds which were run
+
+        Returns:
+            AssignmentResult: The assignment
+        """
+        return AssignmentResult(self._cohort, self._catalogue, self._required_credits_per_student, self._max_credits_per_group,
+                                self._max_credits_per_semester, self._min_credits_per_group, self._min_credits_per_semester,
+                                self._assignments, self._module_spaces_remaining, self._module_spaces_excess_requests,
+                                repetition, n_rounds, self.get_assignment_satisfaction_scores())
+
+    def _get_current_result(self) -> AssignmentResult:
+        """Get a snapshot of the current assignment, which is only taken again once the assignment has changed,
+        so that the getters below can be called many times (e.g. once per student) without copying the assignment each time
+
+        Returns:
+            AssignmentResult: The assignment
+        """
+        if self._current_result is None:
+            self._current_result = self.get_result()
+        return self._current_result
+
+    # The assignment can be inspected with the same methods as an AssignmentResult, which are
+    # applied to a snapshot of the current assignment
+
+    def get_module_dataframe(self):
+        return self._get_current_result().get_module_dataframe()
+
+    def get_assigned_credits_totals(self):
+        return self._get_current_result().get_assigned_credits_totals()
+
+    def get_assigned_modules_totals(self):
+        return self._get_current_result().get_assigned_modules_totals()
+
+    def get_assigned_modules(self, selected_student_id:str):
+        return self._get_current_result().get_assigned_modules(selected_student_id)
+
+    def get_all_assigned_modules(self):
+        return self._get_current_result().get_all_assigned_modules()
+
+    def get_students_list(self):
+        return self._get_current_result().get_students_list()
+
+    def get_assigned_module_students(self):
+        return self._get_current_result().get_assigned_module_students()
+
+    def get_assignment_satisfaction_scores(self):
+        """Get the satisfaction scores of the current assignment (see AssignmentResult.get_assignment_satisfaction_scores),
+        from running totals kept up to date as modules are assigned. This takes O(# students x # module groups) time,
+        so it can be called while the assignment rounds are running.
+
+        Returns:
+            np.ndarray: An array of shape (# students, # module groups) containing satisfaction scores
+        """
+        return _get_satisfaction_scores(self._student_rank_sums_per_group, self._student_modules_per_group, self._catalogue.modules_per_group)
+
+    def get_mean_satisfaction_score(self) -> float:
+        """
+        Returns:
+            float: The mean satisfaction score of the current assignment (see AssignmentResult.mean_satisfaction_score)
+        """
+        return float(np.nanmean(self.get_assignment_satisfaction_scores()))
+
+    def get_excess_module_requests(self):
+        return self._get_current_result().get_excess_module_requests()
+
+    def assignment_satisfies_minimum_credits_per_group(self):
+        return self._get_current_result().assignment_satisfies_minimum_credits_per_group()
+
+    def assignment_satisfies_maximum_credits_per_group(self):
+        return self._get_current_result().assignment_satisfies_maximum_credits_per_group()
+
+    def assignment_satisfies_minimum_credits_per_semester(self):
+        return self._get_current_result().assignment_satisfies_minimum_credits_per_semester()
+
+    def assignment_satisfies_maximum_credits_per_semester(self):
+        return self._get_current_result().assignment_satisfies_maximum_credits_per_semester()
 
 
     def log(self, message):
         print(message)
 
+    def _check_candidate_modules(self, student_idx:int, module_idxs:np.ndarray):
+        """Evaluate each assignment constraint for several candidate modules at once, for one student.
+        Each candidate module is requested together with any of its requirements that have not yet
+        been assigned to the student.
+
+        Args:
+            student_idx (int): Index of the student in the students list
+            module_idxs (np.ndarray): Indices of the candidate modules
+
+        Returns:
+            dict[str, np.ndarray]: One boolean array per constraint, with one entry per candidate module
+        """
+        bundle_idxs = self._module_bundle_idxs[module_idxs]
+        bundle_mask = self._module_bundle_mask[module_idxs]
+
+        # Which modules in each candidate's bundle would be newly assigned to the student
+        assigned = self._assignments.get_student_row(student_idx)
+        already_assigned = bundle_mask & assigned[bundle_idxs]
+        requested = bundle_mask & ~already_assigned
+
+        # The credits of the whole bundle, less the credits of any modules in it already assigned to the student
+        requested_credits_per_group = self._module_bundle_group_credits[module_idxs]
+        requested_credits_per_semester = self._module_bundle_semester_credits[module_idxs]
+        if already_assigned.any():
+            requested_credits_per_group = requested_credits_per_group - (self._module_group_credits[bundle_idxs] * already_assigned[:, :, None]).sum(axis=1)
+            requested_credits_per_semester = requested_credits_per_semester - (self._module_semester_credits[bundle_idxs] * already_assigned[:, :, None]).sum(axis=1)
+
+        # Whether any newly requested module in each bundle is full, mutually excluded, excluded by the student, or least preferred
+        blocking_modules = np.stack((
+            self._module_spaces_remaining <= 0,
+            self._student_mutually_excluded_modules[student_idx],
+            self._student_excluded_modules[student_idx],
+            self._student_least_preferred_modules[student_idx],
+        ))
+        full, excluded, excluded_by_student, least_preferred = (requested & blocking_modules[:, bundle_idxs]).any(axis=2)
+
+        return {
+            "modules_requested": requested.any(axis=1),
+            "modules_have_space_remaining": ~full,
+            "modules_not_excluded": ~excluded,
+            "modules_not_excluded_by_student": ~excluded_by_student,
+            "requested_credits_not_too_many_per_group": (self._student_credits_per_group[student_idx] + requested_credits_per_group <= self._max_credits_per_group).all(axis=1),
+            "requested_credits_not_too_many_total": self._student_credits_per_group[student_idx].sum() + requested_credits_per_group.sum(axis=1) <= self._required_credits_per_student,
+            "requested_credits_per_semester_not_too_many": (self._student_credits_per_semester[student_idx] + requested_credits_per_semester <= self._max_credits_per_semester).all(axis=1),
+            "preferences_okay": ~least_preferred,
+        }
+
+    # Number of relaxation levels. Level 0 relaxes no constraints, and each bit of a level relaxes one constraint:
+    # 1 allows least preferred modules, 2 allows excess credits per group and 4 allows modules that the
+    # student preferentially asked not to be assigned. Lower levels are always tried first.
+    N_RELAXATION_LEVELS = 8
+
+    def _get_relaxation_levels(self, checks:dict[str, np.ndarray]):
+        """Get the lowest relaxation level at which each candidate module could be assigned
+
+        Args:
+            checks (dict[str, np.ndarray]): The constraint checks returned by _check_candidate_modules
+
+        Returns:
+            np.ndarray: An integer array containing the relaxation level of each candidate module, or
+            N_RELAXATION_LEVELS for modules that cannot be assigned even if all constraints are relaxed
+        """
+        assignable = (checks["modules_requested"]
+                      & checks["modules_have_space_remaining"]
+                      & checks["modules_not_excluded"]
+                      & checks["requested_credits_not_too_many_total"]
+                      & checks["requested_credits_per_semester_not_too_many"])
+        levels = (4 * ~checks["modules_not_excluded_by_student"]
+                  + 2 * ~checks["requested_credits_not_too_many_per_group"]
+                  + 1 * ~checks["preferences_okay"])
+        return np.where(assignable, levels, self.N_RELAXATION_LEVELS)
+
+    def _remove_full_module(self, module_idx:int):
+        """Remove a module which has no spaces remaining from every student's order of preference
+
+        Args:
+            module_idx (int): Index of the module in the modules list
+        """
+        g_idx = self._module_group_idxs[module_idx]
+        orders = self._student_group_module_orders[g_idx]
+        if orders.shape[0] > 0 and module_idx in orders[0]:
+            self._student_group_module_orders[g_idx] = orders[orders != module_idx].reshape(orders.shape[0], orders.shape[1] - 1)
+
+    def _get_incomplete_bundle_module_idxs(self, student_idx:int) -> np.ndarray:
+        """Get the modules assigned to a student without all of their requirements, which can only happen with loaded assignments
+
+        Args:
+            student_idx (int): Index of the student in the students list
+
+        Returns:
+            np.ndarray: Indices of the modules
+        """
+        assigned = self._assignments.get_student_row(student_idx)
+        assigned_idxs = np.flatnonzero(assigned)
+        missing = self._module_bundle_mask[assigned_idxs] & ~assigned[self._module_bundle_idxs[assigned_idxs]]
+        return assigned_idxs[missing.any(axis=1)]
+
+    def _get_candidate_orders(self, student_idx:int, group_order:np.ndarray) -> list[np.ndarray]:
+        """Get the candidate modules of a student in each group, in the order the groups are considered, and in
+        descending order of preference (i.e. increasing preference value) within each group. These are the modules
+        with spaces remaining, and any full module assigned to the student without all of its requirements, since
+        its missing requirements are still requested with it.
+
+        Args:
+            student_idx (int): Index of the student in the students list
+            group_order (np.ndarray): Indices of the groups, in the order they are considered
+
+        Returns:
+            list[np.ndarray]: Indices of the candidate modules in each group
+        """
+        candidate_orders = [self._student_group_module_orders[group_idx][student_idx] for group_idx in group_order]
+        if not self._student_holds_incomplete_bundles[student_idx]:
+            return candidate_orders
+
+        incomplete_module_idxs = self._get_incomplete_bundle_module_idxs(student_idx)
+        if len(incomplete_module_idxs) == 0:
+            self._student_holds_incomplete_bundles[student_idx] = False
+            return candidate_orders
+
+        # Full modules have been removed from the orders of preference, so put them back in place
+        positions = self._student_module_preference_positions[student_idx]
+        full_module_idxs = incomplete_module_idxs[self._module_spaces_remaining[incomplete_module_idxs] <= 0]
+        for i, group_idx in enumerate(group_order):
+            group_full_module_idxs = full_module_idxs[self._module_group_idxs[full_module_idxs] == group_idx]
+            if len(group_full_module_idxs) > 0:
+                order = np.concatenate((candidate_orders[i], group_full_module_idxs))
+                candidate_orders[i] = order[np.argsort(positions[order], kind="stable")]
+        return candidate_orders
+
+    def _count_full_module_requests(self, student_idx:int, requested_modules:np.ndarray, preferred_group_idxs:np.ndarray = None, module_idx:int = None):
+        """Count an excess request from the student for each full module they would have chosen before
+        the module they are about to be assigned, or for every full module if no module can be assigned to
+        them without relaxing constraints. Each student is counted only once per module in each round. Full modules
+        already assigned to the student are not counted here, since any such module still requesting requirements
+        is one of the student's candidates (see _get_candidate_orders).
+
+        Args:
+            student_idx (int): Index of the student in the students list
+            requested_modules (np.ndarray): (# students, # modules) boolean array of the excess requests already counted this round
+            preferred_group_idxs (np.ndarray, optional): The groups considered before the group of the module being assigned
+            module_idx (int, optional): Index of the module being assigned
+        """
+        full_module_idxs = np.flatnonzero(self._module_spaces_remaining <= 0)
+        if module_idx is not None:
+            preferred_groups = np.zeros(len(self._unique_module_groups), dtype=bool)
+            preferred_groups[preferred_group_idxs] = True
+            full_module_group_idxs = self._module_group_idxs[full_module_idxs]
+            preferred_positions = self._student_module_preference_positions[student_idx, full_module_idxs] < self._student_module_preference_positions[student_idx, module_idx]
+            full_module_idxs = full_module_idxs[preferred_groups[full_module_group_idxs] | ((full_module_group_idxs == self._module_group_idxs[module_idx]) & preferred_positions)]
+        full_module_idxs = full_module_idxs[~requested_modules[student_idx, full_module_idxs] & ~self._assignments.get_student_row(student_idx)[full_module_idxs]]
+        self._module_spaces_excess_requests[full_module_idxs] += 1
+        requested_modules[student_idx, full_module_idxs] = True
+
+    def _count_dead_student_requests(self, student_idxs:np.ndarray, student_positions:np.ndarray, module_full_from_positions:np.ndarray):
+        """Count the excess requests of students who cannot be assigned any module, as if each had searched every
+        module at their position in the round: each module which would need a full module not assigned to them
+        (including the module itself) to be assigned to them.
+
+        Args:
+            student_idxs (np.ndarray): Indices of the students in the students list
+            student_positions (np.ndarray): Position of each student in the order of the round
+            module_full_from_positions (np.ndarray): Position in the order of the round from which each module was full
+        """
+        full = module_full_from_positions[None, :] < student_positions[:, None]
+        full_not_assigned = full & ~self._assignments.get_student_rows(student_idxs)
+        needs_full_module = (full_not_assigned[:, self._module_bundle_idxs] & self._module_bundle_mask[None, :, :]).any(axis=2)
+        self._module_spaces_excess_requests += needs_full_module.sum(axis=0)
+
+    def _assign_module_bundle(self, student_idx:int, module_idx:int):
+        """Assign a module and any of its requirements not yet assigned to the student,
+        using up one space on each newly assigned module.
+
+        Args:
+            student_idx (int): Index of the student in the students list
+            module_idx (int): Index of the module in the modules list
+
+        Returns:
+            list[int]: Indices of the modules which became full
+        """
+        filled_module_idxs = []
+        for m_idx in self._module_bundle_idxs[module_idx][self._module_bundle_mask[module_idx]]:
+            if self._record_assignment(student_idx, m_idx):
+                self._module_spaces_remaining[m_idx] -= 1
+                if(self._module_spaces_remaining[m_idx] < 0):
+                    print(self._modules[m_idx])
+                if self._module_spaces_remaining[m_idx] == 0:
+                    self._remove_full_module(m_idx)
+                    filled_module_idxs += [m_idx]
+        return filled_module_idxs
+
     def run_assignment_round(self):
         
 
@@ -283,16 +1236,20 @@ class ModuleAssigner:
         This may assign more than one module to each participant, if 
         the module to be assigned has other modules as requirements.
         If there are no modules available which satisfy the constraints
-        for a given student then no module will be assigned to them.
+        for a given student then no module will be assigned to them, and
+        they are not searched again in later rounds.
 
         Returns:
             List[dict[str, boolean]]: A list of dictionaries giving 
             information about constraints that were not satisfied while 
-            trying to assign a module to each participant.
+            trying to assign a module to each participant who could not
+            be assigned a module for the first time in this round.
         """
 
+        self._current_result = None
+
         # How many credits has each student been assigned in each module group
-        assigned_credits_total = np.array(list(map(lambda a: np.sum(a, axis=1), self._student_assigned_credits))).T
+        assigned_credits_total = self._student_credits_per_group
 
         # Which module group is furthest from satisfying the minimum number of credits for that group
         minimum_group_difference = assigned_credits_total - np.array(self._min_credits_per_group)[None, :]
@@ -310,158 +1267,120 @@ class ModuleAssigner:
             next_assignment_group_idxs = preference_ranked_group_order
         
         # Select a random order in which to let students "pick" a module.
-        choice_order = self._rs.permutation(self._n_students)
-        
-        # self.log(assigned_credits_total)
-        # self.log("|||||")
+        choice_order = self._rng.permutation(self._n_students)
 
         # Keep track of which modules each student has already "requested" during allocation
-        requested_modules = dict(zip(self._students, [[] for _ in self._students]))
+        requested_modules = np.zeros((self._n_students, self._n_modules), dtype=bool)
+
+        # The position in the order from which each module is full, so that the excess requests of dead students
+        # can be counted after the round as they would have been at their turn
+        module_full_from_positions = np.where(self._module_spaces_remaining <= 0, -1, self._n_students)
+        dead_positions = np.flatnonzero(self._student_dead[choice_order])
 
         result_trace = []
-        # For each participant in a random order
-        for student_idx in choice_order:
-            considered_modules = []
-            # If the current student has not got enough assigned module credits yet...
-            if np.sum(assigned_credits_total[student_idx]) < self._required_credits_per_student:
+        # For each participant who can still be assigned modules, in a random order
+        for position in np.flatnonzero(self._student_active[choice_order]):
+            student_idx = choice_order[position]
+
+            # The candidate modules in each group, in the order the groups are considered, and in
+            # descending order of preference (i.e. increasing preference value) within each group
+            group_order = next_assignment_group_idxs[student_idx]
+            candidate_orders = self._get_candidate_orders(student_idx, group_order)
+            candidate_module_idxs = np.concatenate(candidate_orders)
+            candidate_group_ranks = np.repeat(np.arange(len(group_order)), [len(o) for o in candidate_orders])
+
+            # Evaluate every candidate module once
+            checks = self._check_candidate_modules(student_idx, candidate_module_idxs)
+            relaxation_levels = self._get_relaxation_levels(checks)
+
+            # Relax as few constraints as possible, and then choose the first module in the first group that can
+            # be assigned at that relaxation level. This is the same module as trying each relaxation in turn:
+            #   for allow_preferentially_exclude_modules in [False, True]:
+            #       for allow_excess_credits_per_group in [False, True]:
+            #           for allow_least_preferred_modules in [False, True]:
+            #               for group_idx in group_order: ...
+            relaxation_level = np.min(relaxation_levels, initial=self.N_RELAXATION_LEVELS)
+            modules_assigned = relaxation_level < self.N_RELAXATION_LEVELS
+            chosen = np.argmax(relaxation_levels == relaxation_level) if modules_assigned else len(candidate_module_idxs)
+
+            # Keep track of how many excess requests (beyond module capacity) each module had during allocation, counting each student only once.
+            # Every candidate is considered before relaxing any constraints, so only stop at the chosen module if none were relaxed.
+            n_considered = chosen if relaxation_level == 0 else len(candidate_module_idxs)
+            over_requested = checks["modules_requested"][:n_considered] & ~checks["modules_have_space_remaining"][:n_considered]
+            over_requested_module_idxs = candidate_module_idxs[:n_considered][over_requested]
+            over_requested_module_idxs = over_requested_module_idxs[~requested_modules[student_idx, over_requested_module_idxs]]
+            self._module_spaces_excess_requests[over_requested_module_idxs] += 1
+            requested_modules[student_idx, over_requested_module_idxs] = True
+            if relaxation_level == 0:
+                self._count_full_module_requests(student_idx, requested_modules, group_order[:candidate_group_ranks[chosen]], candidate_module_idxs[chosen])
+            else:
+                self._count_full_module_requests(student_idx, requested_modules)
+
+            # Assign the module and its requirements to the student
+            if modules_assigned:
+                module_full_from_positions[self._assign_module_bundle(student_idx, candidate_module_idxs[chosen])] = position
+                continue
+
+            # No module can be assigned to the student now, so none can be in any later round either
+            self._student_active[student_idx] = False
+            self._student_dead[student_idx] = True
+
+            # Report the constraint checks of the last requested module, with all constraints relaxed. Every module
+            # is checked again, including the full modules which are no longer candidates, in the order of the search.
+            all_module_idxs = []
+            for group_idx in group_order:
+                group_module_idxs = self._group_module_idxs[group_idx]
+                order = np.empty_like(group_module_idxs)
+                order[self._student_module_preference_positions[student_idx, group_module_idxs]] = group_module_idxs
+                all_module_idxs.append(order)
+            checks = self._check_candidate_modules(student_idx, np.concatenate(all_module_idxs))
+            last_result = None
+            requested_idxs = np.flatnonzero(checks["modules_requested"])
+            if len(requested_idxs) > 0:
+                last_result = {k: bool(v[requested_idxs[-1]]) for k, v in checks.items()}
+                last_result["requested_credits_not_too_many_per_group"] = True
+                last_result["preferences_okay"] = True
+
+            if last_result is not None:
+                result_trace += [dict(zip(["student_id",
+                                          "modules_have_space_remaining", 
+                                          "modules_not_excluded", 
+                                          "requested_credits_not_too_many_per_group", 
+                                          "requested_credits_not_too_many_total", 
+                                          "requested_credits_per_semester_not_too_many",
+                                          "preferences_okay"],
+                                         [self._student_ids[student_idx],
+                                         last_result["modules_have_space_remaining"], 
+                                         last_result["modules_not_excluded"], 
+                                         last_result["requested_credits_not_too_many_per_group"], 
+                                         last_result["requested_credits_not_too_many_total"], 
+                                         last_result["requested_credits_per_semester_not_too_many"],
+                                         last_result["preferences_okay"]]))]
+
+        self._count_dead_student_requests(choice_order[dead_positions], dead_positions, module_full_from_positions)
+
+        return result_trace
+
+    def run_assignment_rounds(self, max_rounds:int = None, progress:Callable[[int, float], None] = None):
+        """Run assignment rounds until a round assigns no modules, every student
+        has been assigned enough credits (or can't be assigned any more modules),
+        or max_rounds rounds have been run.
 
-                modules_assigned = False
-
-                # We may need to relax the constraint of not assigning students modules they preferentially request not to be assigned
-                for allow_preferentially_exclude_modules in [False, True]:
-                    
-                    # We may need to relax the maximum credits per group requirement
-                    for allow_excess_credits_per_group in [False, True]:
+        Args:
+            max_rounds (int, optional): The largest number of rounds to run. Defaults to None, for no limit.
+            progress (Callable[[int, float], None], optional): Called with the number of rounds run so far and
+                the current mean satisfaction score after each round
 
-                        # We may need to relax the constraint of not assigning students their least preferred modules in each group
-                        for allow_least_preferred_modules in [False, True]:
-                            # Select the group of modules needing a new assignment for this participant.
-                            # If we can't allocate a module in the preferred group, try the next most preferred group.
-                            for group_idx in next_assignment_group_idxs[student_idx]:
-
-                                if not modules_assigned:
-
-                                    # The module preference rankings of the current student for the current module group 
-                                    current_student_group_module_prefs = self._student_module_grouped_preferences[group_idx][student_idx]
-
-                                    # For each module in descending order of preference (i.e. increasing preference value)...
-                                    for module_idx in np.argsort(current_student_group_module_prefs):
-
-                                        student_assigned_modules:list[Module] = self.get_assigned_modules(self._student_ids[student_idx])
-
-                                        student_assigned_credits_per_semester = np.zeros(len(self._max_credits_per_semester))
-                                        for m in student_assigned_modules:                       
-                                            student_assigned_credits_per_semester[self._unique_semesters.index(m.semester)] += m.credits
-
-                                        # Select this student's most preferred module in the current module group
-                                        module:Module = self._grouped_modules[group_idx][module_idx]
-
-                                        considered_modules += [module]
-                                        
-                                        # Select the module and its requirements that have not yet been assigned to this student
-                                        modules_to_assign = set(module.requirements + [module]).difference(student_assigned_modules)
-
-                                        if len(modules_to_assign) > 0:                    
-
-                                            requested_credits_per_group = np.zeros(len(self._max_credits_per_group))
-                                            for m in modules_to_assign:
-                                                requested_credits_per_group[self._unique_module_groups.index(m.group)] += m.credits
-
-                                            requested_credits_per_semester = np.zeros(len(self._max_credits_per_semester))
-                                            for m in modules_to_assign:                       
-                                                requested_credits_per_semester[self._unique_semesters.index(m.semester)] += m.credits
-                                            
-                                            # If both the selected module and its requirements have space remaining for new students...
-                                            modules_have_space_remaining = np.all([m.available_spaces > 0 for m in modules_to_assign])
-                                            
-                                            # If neither the selected module nor its requirements are mutually excluded by already assigned modules...                
-                                            current_student_mutual_exclusions = [ex_m for m in student_assigned_modules for ex_m in m.mutual_exclusions]
-                                            modules_not_excluded = set(modules_to_assign).isdisjoint(current_student_mutual_exclusions)
-
-                                            # If the selected module and its requirements are not in the list of modules specifically excluded by this student...
-                                            modules_not_excluded_by_student = set(map(lambda m: m.module_id, modules_to_assign)).isdisjoint(self._students[student_idx].excluded_modules_by_id) if not allow_preferentially_exclude_modules else True
-
-                                            # If the selected module and its requirements will not give the student too many credits in each group...
-                                            requested_credits_not_too_many_per_group = np.all(assigned_credits_total[student_idx] + requested_credits_per_group <= self._max_credits_per_group) if not allow_excess_credits_per_group else True
-
-                                            # If the selected module and its requirements will not give the student too many credits in total, across all groups...
-                                            requested_credits_not_too_many_total = np.sum(assigned_credits_total[student_idx] + requested_credits_per_group) <= self._required_credits_per_student
-
-                                            # If the selected module and its requirements will not give the student too many credits in one semester...
-                                            requested_credits_per_semester_not_too_many = np.all(student_assigned_credits_per_semester + requested_credits_per_semester <= self._max_credits_per_semester)
-
-                                            # If one of the selected modules has the lowest possible preference (i.e. largest preference rating) in its module group
-                                            least_preferred_module_selected = np.any([current_student_group_module_prefs[self._grouped_modules[group_idx].index(m)] == np.max(current_student_group_module_prefs) for m in modules_to_assign])
-                                            preferences_okay = (not least_preferred_module_selected) or (least_preferred_module_selected and allow_least_preferred_modules)            
-
-                                            # Keep track of how many excess requests (beyond module capacity) each module had during allocation, counting each student only once
-                                            if not modules_have_space_remaining:
-                                                if not m in requested_modules[self._students[student_idx]]:
-                                                    self._module_spaces_excess_requests[m] = self._module_spaces_excess_requests[m] + 1
-                                                    requested_modules[self._students[student_idx]] = requested_modules[self._students[student_idx]] + [m]
-
-                                            # if not modules_have_space_remaining:
-                                            #     self.log("Assignment pass failed: Requested modules have no spaces remaining")
-                                            #     continue
-
-                                            # if not modules_not_excluded:
-                                            #     self.log("Assignment pass failed: Mutually excluded modules were requested")
-                                            #     continue
-
-                                            # if not modules_not_excluded_by_student:
-                                            #     self.log("Assignment pass failed: Student excluded modules were requested")
-                                            #     continue
-
-                                            # if not requested_credits_not_too_many_per_group:
-                                            #     self.log("Assignment pass failed: Requested modules exceeded per group credit maximum")
-                                            #     continue
-
-                                            # if not requested_credits_not_too_many_total:
-                                            #     self.log("Assignment pass failed: Requested modules exceeded total credit maximum")
-                                            #     continue
-
-                                            # if not requested_credits_per_semester_not_too_many:
-                                            #     self.log("Assignment pass failed: Requested modules exceeded per semester credit maximum")
-                                            #     continue
-
-                                            # if not preferences_okay:
-                                            #     self.log("Assignment pass failed: Requested modules included lowest-ranked module for the current student")
-                                            #     continue
-
-
-                                            # Assign the module and its requirements to the student
-                                            if modules_have_space_remaining and modules_not_excluded and modules_not_excluded_by_student and requested_credits_not_too_many_per_group and requested_credits_not_too_many_total and requested_credits_per_semester_not_too_many and preferences_okay:
-                                                for m in modules_to_assign:
-                                                    g_idx = self._unique_module_groups.index(m.group)
-                                                    m_idx = self._grouped_modules[g_idx].index(m)                                    
-                                                    self._student_assigned_credits[g_idx][student_idx][m_idx] = m.credits
-                                                    m.available_spaces -= 1
-                                                    #self._module_spaces_remaining[m] = self._module_spaces_remaining[m] - 1
-                                                    #self._modules[self._modules.index(m)].available_spaces -= 1
-                                                    assigned_credits_total[student_idx][g_idx] += m.credits
-                                                    modules_assigned = True
-                                                    if(m.available_spaces < 0):
-                                                        print(m)
-                                                break
-                                    
-                    if modules_assigned:
-                        break
-                    
-                if not modules_assigned:
-                    result_trace += [dict(zip(["student_id",
-                                              "modules_have_space_remaining", 
-                                              "modules_not_excluded", 
-                                              "requested_credits_not_too_many_per_group", 
-                                              "requested_credits_not_too_many_total", 
-                                              "requested_credits_per_semester_not_too_many",
-                                              "preferences_okay"],
-                                             [self._student_ids[student_idx],
-                                             modules_have_space_remaining, 
-                                             modules_not_excluded, 
-                                             requested_credits_not_too_many_per_group, 
-                                             requested_credits_not_too_many_total, 
-                                             requested_credits_per_semester_not_too_many,
-                                             preferences_okay]))]
-            #print(len(set(considered_modules)), set(considered_modules))
-
-        return result_trace
\ No newline at end of file
+        Returns:
+            int: The number of rounds that were run
+        """
+        n_rounds = 0
+        while (max_rounds is None or n_rounds < max_rounds) and np.any(self._student_active):
+            assigned_credits_total = self._student_credits_per_group.sum()
+            self.run_assignment_round()
+            n_rounds += 1
+            if progress is not None:
+                progress(n_rounds, self.get_mean_satisfaction_score())
+            if self._student_credits_per_group.sum() == assigned_credits_total:
+                break
+        return n_rounds
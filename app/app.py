@@ -1,11 +1,9 @@
 from pathlib import Path
-from zipfile import ZipFile
 from htmltools import HTML
-import numpy as np
 import pandas as pd
 from shiny.express import ui, input, render
 from shiny import reactive
-from algorithm import ModuleAssigner
+from algorithm import ModuleCatalogue
 from custom_widgets import input_file_area
 from data_loading import (
     check_ranking_and_group_ids_match,
@@ -20,17 +18,20 @@ from data_loading import (
     validate_module_group_preferences_data,
     validate_module_rankings_data,
 )
-from io import BytesIO
 from faicons import icon_svg
+from export import get_assignment_zip, get_assignments_zip
+from search import BASE_RANDOM_SEED, AssignmentSearch
 
 APP_VERSION = "0.2.0"
 
-BASE_RANDOM_SEED = 8194761
-
 MAX_SIZE = 50000
+
+# The largest number of errors shown for each uploaded data file
+MAX_VALIDATION_ERRORS = 50
 ACCEPTED_FILETYPES = [".csv"]
 
 module_data = reactive.value()
+module_catalogue_data = reactive.value()
 module_dataframe = reactive.value()
 module_data_error = reactive.value()
 _ = module_data_error.set(False)
@@ -60,7 +61,8 @@ student_previous_module_allocations_error = reactive.value()
 _ = student_previous_module_allocations_error.set(False)
 student_data = reactive.value()
 
-best_assignment_module_assigner_data = reactive.value()
+best_assignment_result_data = reactive.value()
+top_assignment_results_data = reactive.value()
 best_assignment_data = reactive.value()
 excess_module_requests_data = reactive.value()
 module_allocation_state_data = reactive.value()
@@ -304,6 +306,26 @@ def _():
                             min=1,
                             max=250,
                         )
+                        ui.input_numeric(
+                            "search_time_limit",
+                            "Stop Search After N Seconds (0 for No Limit)",
+                            0,
+                            min=0,
+                        )
+                        ui.input_numeric(
+                            "search_plateau_repetitions",
+                            "Stop Search After N Repetitions Without Improvement (0 for Never)",
+                            0,
+                            min=0,
+                            max=250,
+                        )
+                        ui.input_numeric(
+                            "assignments_to_keep",
+                            "Keep Best N Allocations For Comparison",
+                            5,
+                            min=1,
+                            max=50,
+                        )
                         ui.input_action_button("run", "Run Assignment")
 
                         @render.ui
@@ -312,7 +334,20 @@ def _():
                                 render.download(
                                     download, filename="assigned_modules.zip"
                                 )
-                                if best_assignment_module_assigner_data.is_set()
+                                if best_assignment_result_data.is_set()
+                                else None
+                            )
+
+                        @render.ui
+                        def download_top_assignments_button():
+                            return (
+                                render.download(
+                                    download_top_assignments,
+                                    label="Download Best Allocations",
+                                    filename="best_assigned_modules.zip",
+                                )
+                                if top_assignment_results_data.is_set()
+                                and len(top_assignment_results_data.get()) > 1
                                 else None
                             )
 
@@ -411,6 +446,7 @@ def load_student_data():
 def _():
     module_data.set(None)
     module_data.unset()
+    module_catalogue_data.unset()
 
 
 @reactive.effect
@@ -452,7 +488,7 @@ def file_content():
 
     try:
         module_df = load_module_data(Path(modules_file_info["datapath"]))
-        errors = validate_module_data(module_df)
+        errors = validate_module_data(module_df, MAX_VALIDATION_ERRORS)
         if len(errors) > 0:
             ui.modal_show(
                 create_error_modal("\n".join([f"<p>{e}</p>" for e in errors]))
@@ -468,6 +504,7 @@ def file_content():
         ) = get_formatted_module_data(module_df)
         module_dataframe.set(module_df)
         module_data.set(modules)
+        module_catalogue_data.set(ModuleCatalogue(modules))
         module_groups_data.set(module_groups)
         semesters_data.set(semesters)
         module_data_error.set(False)
@@ -492,7 +529,7 @@ def file_content():
         module_rankings_data = load_module_rankings_data(
             student_module_rankings_file_info["datapath"]
         )
-        errors = validate_module_rankings_data(module_rankings_data)
+        errors = validate_module_rankings_data(module_rankings_data, MAX_VALIDATION_ERRORS)
 
         if len(errors) > 0:
             ui.modal_show(
@@ -525,7 +562,7 @@ def file_content():
         student_group_preferences_data = load_module_rankings_data(
             student_group_preferences_file_info["datapath"]
         )
-        errors = validate_module_group_preferences_data(student_group_preferences_data)
+        errors = validate_module_group_preferences_data(student_group_preferences_data, MAX_VALIDATION_ERRORS)
 
         if len(errors) > 0:
             ui.modal_show(
@@ -562,7 +599,7 @@ def file_content():
         student_previous_assignments_data = load_module_assignments(
             student_previous_module_allocations_file_info["datapath"]
         )
-        errors = validate_module_assignments_data(student_previous_assignments_data)
+        errors = validate_module_assignments_data(student_previous_assignments_data, MAX_VALIDATION_ERRORS)
 
         if len(errors) > 0:
             ui.modal_show(
@@ -613,36 +650,51 @@ async def show_message():
 
     else:
         assignment_repetitions = input["assignment_runs"].get()
-        best_assignment = None
 
         loaded_module_assignments = None
         if student_previous_module_allocations.is_set():
             loaded_module_assignments = student_previous_module_allocations.get()
 
-        with ui.Progress(min=1, max=assignment_repetitions) as p:
-            for r in range(assignment_repetitions):
-                p.set(
-                    message="Running module assignment",
-                    detail=f"{r+1} of {assignment_repetitions}",
-                )
-                best_assignment = run_assignments(
-                    r,
-                    best_assignment,
-                    input["early_stop_number"].get(),
-                    input["validate_constraints"].get(),
-                    loaded_module_assignments,
-                )
-                p.set(r)
+        search = create_assignment_search(loaded_module_assignments)
+
+        with ui.Progress(min=0, max=assignment_repetitions) as p:
+            p.set(
+                message="Running module assignment",
+                detail=f"0 of {assignment_repetitions}",
+            )
 
-        if not best_assignment is None:
-            best_assignment_module_assigner_data.set(best_assignment)
-            best_assignment_data.set(best_assignment.get_all_assigned_modules())
+            def show_progress(n_completed, result):
+                print(f"Repetition {result.repetition} finished after {result.n_rounds} rounds | constraints_satisfied = {result.constraints_satisfied} | mean score = {result.mean_satisfaction_score}")
+                p.set(n_completed, detail=f"{n_completed} of {assignment_repetitions}")
+
+            best_result = search.run(
+                assignment_repetitions,
+                progress=show_progress,
+                time_budget=input["search_time_limit"].get() or None,
+                plateau_repetitions=input["search_plateau_repetitions"].get() or None,
+                n_top_results=input["assignments_to_keep"].get() or 1,
+            )
+
+        if not best_result is None:
+            print(f"Best assignment from repetition {best_result.repetition}")
+            best_assignment_result_data.set(best_result)
+            top_assignment_results_data.set(search.top_results.get_results())
+            best_assignment_data.set(best_result.get_all_assigned_modules())
             excess_module_requests_data.set(
-                best_assignment.get_excess_module_requests().sort_values(
+                best_result.get_excess_module_requests().sort_values(
                     "excess_requests", ascending=False
                 )
             )
-            module_allocation_state_data.set(best_assignment.get_module_dataframe())
+            module_allocation_state_data.set(best_result.get_module_dataframe())
+
+            constraint_report = best_result.constraint_report
+            if not constraint_report.all_satisfied:
+                n_unsatisfied = int((~constraint_report.students_satisfied).sum())
+                ui.notification_show(
+                    f"{n_unsatisfied} of {len(constraint_report.students_satisfied)} students do not meet every credit constraint in the best assignment found. See constraints_summary.csv in the downloaded results for details.",
+                    type="warning",
+                    duration=None,
+                )
 
         else:
             ui.notification_show(
@@ -653,73 +705,13 @@ async def show_message():
 
 
 def download():
-    if best_assignment_module_assigner_data.is_set():
-        module_assignments: ModuleAssigner = best_assignment_module_assigner_data.get()
-        module_ids, assigned_students_data = (
-            module_assignments.get_assigned_module_students()
-        )
-        zip_file = BytesIO()
-        with ZipFile(zip_file, "w") as zf:
-            # Write the csv files containing student IDs assigned to each module
-            for m_idx, m in enumerate(module_ids):
-                b = BytesIO()
-                assigned_students_data[m_idx].to_csv(b, index=False, header=True)
-                zf.writestr(f"{m}.csv", b.getvalue())
-
-            # Write the summary of all module assignments for all students to an csv file
-            b_assignment_summary = BytesIO()
-            best_assignment_data.get().to_csv(
-                b_assignment_summary, index=False, header=True
-            )
-            zf.writestr(
-                f"module_assignment_summary.csv", b_assignment_summary.getvalue()
-            )
-
-            #
-            best_module_assigner = best_assignment_module_assigner_data.get()
-            semester_min_credits_satisfied, semester_labels = best_module_assigner.assignment_satisfies_minimum_credits_per_semester()
-            df_semester_min = pd.DataFrame(semester_min_credits_satisfied, columns=[f"min_credits_per_semester_satisfied_{l}" for l in semester_labels])
-
-            semester_max_credits_satisfied, semester_labels = best_module_assigner.assignment_satisfies_maximum_credits_per_semester()
-            df_semester_max = pd.DataFrame(semester_max_credits_satisfied, columns=[f"max_credits_per_semester_not_exceeded_{l}" for l in semester_labels])
-
-            group_min_credits_satisfield, group_labels = best_module_assigner.assignment_satisfies_minimum_credits_per_group()
-            df_group_min = pd.DataFrame(group_min_credits_satisfield, columns=[f"min_credits_per_group_satisfied_{l}" for l in group_labels])
-
-            group_max_credits_satisfield, group_labels = best_module_assigner.assignment_satisfies_maximum_credits_per_group()
-            df_group_max = pd.DataFrame(group_max_credits_satisfield, columns=[f"max_credits_per_group_not_exceeded_{l}" for l in group_labels])
-
-            total_credits_satisfied = best_module_assigner.get_assigned_credits_totals() == best_module_assigner._required_credits_per_student
-            df_total_credits = pd.DataFrame(total_credits_satisfied, columns=["required_credits_total_satisfied"])
-
-            student_list_df = best_module_assigner.get_students_list()
+    if best_assignment_result_data.is_set():
+        yield get_assignment_zip(best_assignment_result_data.get())
 
-            constraints_df = pd.concat([student_list_df, df_semester_min, df_semester_max, df_group_min, df_group_max, df_total_credits], axis=1)
-            b_constraints_summary = BytesIO()
-            constraints_df.to_csv(
-                b_constraints_summary, index=False, header=True
-            )
-            zf.writestr(
-                f"constraints_summary.csv", b_constraints_summary.getvalue()
-            )
-
-            # Write data on excess module requests to an csv file
-            b_over_requested_modules = BytesIO()
-            excess_module_requests_data.get().to_csv(
-                b_over_requested_modules, index=False, header=True
-            )
-            zf.writestr(
-                f"excess_module_requests.csv", b_over_requested_modules.getvalue()
-            )
-
-            # Write the list of modules and associated metadata (including remaining spaces on each module) back to an csv file
-            b_module_allocation_state = BytesIO()
-            module_allocation_state_data.get().to_csv(
-                b_module_allocation_state, index=False, header=True
-            )
-            zf.writestr(f"module_metadata.csv", b_module_allocation_state.getvalue())
 
-        yield zip_file.getvalue()
+def download_top_assignments():
+    if top_assignment_results_data.is_set():
+        yield get_assignments_zip(top_assignment_results_data.get())
 
 
 def persist_module_allocation_settings():
@@ -770,21 +762,11 @@ def reload_module_allocation_settings():
         
 
 
-def run_assignments(
-    repetition: int,
-    previous_assignment: ModuleAssigner,
-    halt_after_n_assignments: int,
-    check_constraints: bool,
-    loaded_module_assignments: pd.DataFrame,
-):
-    print(f"Running {repetition}")
-    successful_assignments = []
-    successful_assignment_mean_scores = []
-    successful_assignment_median_scores = []
-
-    module_assigner = ModuleAssigner(
+def create_assignment_search(loaded_module_assignments: pd.DataFrame):
+    """Create a random search over module assignments, using the current data and settings"""
+    return AssignmentSearch(
         student_data.get(),
-        module_data.get(),
+        module_catalogue_data.get(),
         input.required_credits_per_student.get(),
         dict(
             zip(
@@ -822,66 +804,8 @@ def run_assignments(
                 ],
             )
         ),
-        input["custom_random_seed"].get() + repetition * input["custom_random_seed"].get() + 1,
+        input["custom_random_seed"].get(),
+        input["early_stop_number"].get(),
+        input["validate_constraints"].get(),
+        loaded_module_assignments,
     )
-
-    print(f"Module assigner seed: {module_assigner._random_seed}")
-
-    print("Loading pre-existing module assignments")
-    if not loaded_module_assignments is None:
-        module_assigner.set_loaded_module_assignments(loaded_module_assignments)
-
-    result_messages = []
-    for i in range(halt_after_n_assignments):
-        result_messages = module_assigner.run_assignment_round()
-
-
-    semester_min_credits_satisfied, semester_labels = module_assigner.assignment_satisfies_minimum_credits_per_semester()
-    semester_minimum_satisfied = np.all(semester_min_credits_satisfied)
-
-    group_min_credits_satisfield, group_labels = module_assigner.assignment_satisfies_minimum_credits_per_group()
-    group_minimum_satisfied = np.all(group_min_credits_satisfield)
-
-    total_credits_satisfied = module_assigner.get_assigned_credits_totals() == module_assigner._required_credits_per_student
-    credit_total_satisfied = np.all(total_credits_satisfied)
-
-    print(f"semester_minimum_satisfied = {semester_minimum_satisfied} | group_minimum_satisfied = {group_minimum_satisfied} | credit_total_satisfied = {credit_total_satisfied}")
- 
-    if (
-        semester_minimum_satisfied
-        and group_minimum_satisfied
-        and credit_total_satisfied
-    ) or (not check_constraints):
-        successful_assignments.append(module_assigner)
-
-    best_assignment = previous_assignment
-    if len(successful_assignments) > 0:
-        if best_assignment is None:
-            best_assignment = successful_assignments[0]
-        else:
-            previous_scores = best_assignment.get_assignment_satisfaction_scores()
-            current_scores = successful_assignments[
-                0
-            ].get_assignment_satisfaction_scores()
-
-            previous_overallocation = best_assignment.get_excess_module_requests()
-            current_overallocation = successful_assignments[
-                0
-            ].get_excess_module_requests()
-
-            previous_overallocation_mean = previous_overallocation["proportion_overrequested"].mean()
-            current_overallocation_mean = current_overallocation["proportion_overrequested"].mean()
-
-            previous_mean_score = np.nanmean(previous_scores)
-            current_mean_score = np.nanmean(current_scores)
-
-            best_assignment = (
-                successful_assignments[0]
-                if (current_mean_score >= previous_mean_score)
-                else best_assignment
-            )
-            if (current_mean_score >= previous_mean_score) and (current_overallocation_mean <= previous_overallocation_mean):
-                best_assignment = successful_assignments[0]
-                print(f"Updated best assignment {repetition} {previous_mean_score} {current_mean_score}")
-            
-    return best_assignment
@@ -0,0 +1,190 @@
+"""Run module assignment without the web app, and write the results to a ZIP file.
+
+Example:
+    python app/cli.py modules.csv rankings.csv group_preferences.csv constraints.json -o assigned_modules.zip
+
+The constraints file is a JSON object such as:
+    {
+        "required_credits_per_student": 60,
+        "max_credits_per_group": {"core": 40, "optional": 30},
+        "min_credits_per_group": {"core": 20, "optional": 10},
+        "max_credits_per_semester": {"1": 40, "2": 40},
+        "min_credits_per_semester": {"1": 20, "2": 20},
+        "max_rounds": 3,
+        "check_constraints": false
+    }
+"max_rounds" and "check_constraints" are optional, and have the same meaning as the
+"Stop After N Modules Per Student" and "Post-check module/credit constraints" settings
+in the app.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from data_loading import (
+    check_ranking_and_group_ids_match,
+    check_sufficient_module_spaces,
+    get_formatted_module_data,
+    load_module_assignments,
+    load_module_data,
+    load_module_group_preferences_data,
+    load_module_rankings_data,
+    load_students,
+    validate_module_assignments_data,
+    validate_module_data,
+    validate_module_group_preferences_data,
+    validate_module_rankings_data,
+)
+from export import write_assignment_zip, write_assignments_zip
+from search import BASE_RANDOM_SEED, AssignmentSearch
+
+DEFAULT_REPETITIONS = 10
+
+
+def log(message:str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def exit_with_errors(errors:list[str]):
+    for e in errors:
+        log(f"Error: {e}")
+    sys.exit(1)
+
+
+def get_constraints_per_item(constraints:dict, key:str, items:list) -> dict:
+    """Get the constraint values for each module group or semester from the constraints file,
+    where JSON object keys are always strings
+
+    Args:
+        constraints (dict): The loaded constraints file
+        key (str): The name of the constraint
+        items (list): The module groups or semesters
+
+    Returns:
+        dict: The constraint value for each item
+    """
+    values = {str(k): v for k, v in constraints[key].items()}
+    missing_items = [str(i) for i in items if str(i) not in values]
+    if len(missing_items) > 0:
+        exit_with_errors([f"'{key}' in the constraints file has no value for {', '.join(missing_items)}"])
+    return {i: values[str(i)] for i in items}
+
+
+def parse_args(args:list[str] = None):
+    parser = argparse.ArgumentParser(description="Assign students to modules, and write the results to a ZIP file.")
+    parser.add_argument("modules", type=Path, help="csv file containing the module data")
+    parser.add_argument("module_rankings", type=Path, help="csv file containing the students' module rankings")
+    parser.add_argument("module_group_preferences", type=Path, help="csv file containing the students' module group preferences")
+    parser.add_argument("constraints", type=Path, help="JSON file containing the credit constraints")
+    parser.add_argument("--previous-assignments", type=Path, help="csv file containing pre-existing module assignments")
+    parser.add_argument("-o", "--output", type=Path, default=Path("assigned_modules.zip"), help="ZIP file to write the results to (default: %(default)s)")
+    parser.add_argument("-n", "--repetitions", type=int, default=None, help=f"number of random search repetitions (default: {DEFAULT_REPETITIONS}, or no limit if a time budget or plateau is given)")
+    parser.add_argument("-s", "--seed", type=int, default=BASE_RANDOM_SEED, help="random seed (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("-t", "--time-budget", type=float, default=None, help="stop the search after this many seconds")
+    parser.add_argument("--plateau-repetitions", type=int, default=None, help="stop the search after this many repetitions without the best mean satisfaction score improving")
+    parser.add_argument("--plateau-epsilon", type=float, default=0.0, help="smallest improvement in mean satisfaction score that resets --plateau-repetitions (default: %(default)s)")
+    parser.add_argument("--keep-top", type=int, default=1, metavar="K", help="also write the best K assignments to <output>_top_<K>.zip, to compare alternatives (default: %(default)s)")
+    parser.add_argument("--max-errors", type=int, default=None, metavar="N", help="stop checking each data file after finding N errors (default: report every error)")
+    parser.add_argument("--replay", type=int, default=None, metavar="REPETITION", help="only rerun the given repetition of a search with the same seed (numbered from 1, as in the progress messages), and write its results")
+    args = parser.parse_args(args)
+    if args.max_errors is not None and args.max_errors < 1:
+        parser.error("--max-errors must be at least 1")
+    if args.repetitions is None and args.time_budget is None and args.plateau_repetitions is None:
+        args.repetitions = DEFAULT_REPETITIONS
+    return args
+
+
+def main(args:list[str] = None):
+    args = parse_args(args)
+
+    # Load and check the module data
+    module_df = load_module_data(args.modules)
+    errors = validate_module_data(module_df, args.max_errors)
+    if len(errors) > 0:
+        exit_with_errors(errors)
+    modules, module_groups, semesters, required_modules_not_found, mutually_excluded_modules_not_found = get_formatted_module_data(module_df)
+    for m in required_modules_not_found:
+        log(f"Warning: Required module '{m}' was not found in the module data file")
+    for m in mutually_excluded_modules_not_found:
+        log(f"Warning: Mutually excluded module '{m}' was not found in the module data file")
+
+    # Load and check the student data
+    module_rankings_data = load_module_rankings_data(args.module_rankings)
+    errors = validate_module_rankings_data(module_rankings_data, args.max_errors)
+    module_group_preferences_data = load_module_group_preferences_data(args.module_group_preferences)
+    errors += validate_module_group_preferences_data(module_group_preferences_data, args.max_errors)
+    if len(errors) > 0:
+        exit_with_errors(errors)
+
+    missing_from_rankings, missing_from_group_prefs = check_ranking_and_group_ids_match(module_rankings_data, module_group_preferences_data)
+    errors = [f"Student ID '{e}' is present in the Group Preferences file, but missing from the Rankings file" for e in missing_from_rankings]
+    errors += [f"Student ID '{e}' is present in the Rankings file, but missing from the Group Preferences file" for e in missing_from_group_prefs]
+    if len(errors) > 0:
+        exit_with_errors(errors)
+
+    for (group_id, total_requested_spaces, total_available_spaces) in check_sufficient_module_spaces(module_df, module_group_preferences_data):
+        if total_requested_spaces > total_available_spaces:
+            log(f"Warning: Students requested {total_requested_spaces} module spaces in group '{group_id}', but only {total_available_spaces} are available.")
+
+    students, students_missing_ranks, students_missing_ids, missing_modules = load_students(module_rankings_data, module_group_preferences_data, modules)
+    errors = [f"Module '{m}' is missing from the Rankings file" for m in missing_modules]
+    errors += [f"Student with ID '{s}' has module preference rankings missing in the Rankings file" for s in students_missing_ranks]
+    if len(errors) > 0:
+        exit_with_errors(errors)
+
+    # Load and check any pre-existing module assignments
+    loaded_module_assignments = None
+    if args.previous_assignments is not None:
+        loaded_module_assignments = load_module_assignments(args.previous_assignments)
+        errors = validate_module_assignments_data(loaded_module_assignments, args.max_errors)
+        if len(errors) > 0:
+            exit_with_errors(errors)
+        loaded_module_assignments["student_id"] = loaded_module_assignments["student_id"].astype(str)
+
+    with open(args.constraints) as f:
+        constraints = json.load(f)
+
+    search = AssignmentSearch(
+        students,
+        modules,
+        constraints["required_credits_per_student"],
+        get_constraints_per_item(constraints, "max_credits_per_group", module_groups),
+        get_constraints_per_item(constraints, "max_credits_per_semester", semesters),
+        get_constraints_per_item(constraints, "min_credits_per_group", module_groups),
+        get_constraints_per_item(constraints, "min_credits_per_semester", semesters),
+        args.seed,
+        constraints.get("max_rounds"),
+        constraints.get("check_constraints", False),
+        loaded_module_assignments,
+    )
+
+    if args.replay is not None:
+        log(f"Replaying repetition {args.replay} for {len(students)} students and {len(modules)} modules")
+        write_assignment_zip(search.run_repetition(args.replay - 1), args.output)
+        log(f"Wrote {args.output}")
+        return
+
+    repetitions_label = f" of {args.repetitions}" if args.repetitions is not None else ""
+    def show_progress(n_completed, result):
+        best_score = search.best_result.mean_satisfaction_score if search.best_result is not None else float("nan")
+        log(f"Repetition {n_completed}{repetitions_label} finished after {result.n_rounds} rounds | constraints_satisfied = {result.constraints_satisfied} | mean score = {result.mean_satisfaction_score:.4f} | best mean score = {best_score:.4f}")
+
+    log(f"Running module assignment for {len(students)} students and {len(modules)} modules")
+    best_result = search.run(args.repetitions, args.workers, show_progress, args.time_budget, args.plateau_repetitions, args.plateau_epsilon, args.keep_top)
+    if best_result is None:
+        exit_with_errors(["No assignments satisfying the provided constraints were found. Please check the constraints and try again."])
+
+    log(f"Best assignment from repetition {best_result.repetition + 1} (mean score = {best_result.mean_satisfaction_score:.4f})")
+    write_assignment_zip(best_result, args.output)
+    log(f"Wrote {args.output}")
+
+    if args.keep_top > 1:
+        top_output = args.output.with_name(f"{args.output.stem}_top_{args.keep_top}.zip")
+        write_assignments_zip(search.top_results.get_results(), top_output)
+        log(f"Wrote the best {len(search.top_results)} assignments to {top_output}")
+
+
+if __name__ == "__main__":
+    main()
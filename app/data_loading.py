@@ -2,43 +2,135 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-from algorithm import Module, ModuleAssigner, Student
+from algorithm import Module, ModuleAssigner, StudentCohort
 
 
+# Columns read from the module data file, and the types of the columns which are not numeric
+MODULE_DATA_COLUMNS = ["module_id", "module_name", "module_group", "semester", "credits", "capacity", "available_spaces", "required_modules", "mutually_excluded_modules"]
+MODULE_DATA_DTYPES = {"module_id": str, "module_name": str, "module_group": str, "required_modules": str, "mutually_excluded_modules": str}
+
+# Types of the columns identifying students in the student data files. All other columns are read as numbers, apart
+# from the excluded modules in the rankings file.
+STUDENT_DATA_DTYPES = {"student_name": str, "student_id": str, "excluded_modules": str}
+
+
+class DataValidationError:
+    """A problem found in a data file, with the row and column of the problem where there is one.
+    Converting the error to a string gives the message shown to the user.
+    """
+    __slots__ = ("kind", "message", "row", "column")
+
+    # Kinds of error
+    MISSING_COLUMN = "missing_column"
+    MISSING_ID = "missing_id"
+    DUPLICATE_ID = "duplicate_id"
+    UNRECOGNISED_CHARACTERS = "unrecognised_characters"
+    NOT_A_NUMBER = "not_a_number"
+
+    def __init__(self, kind:str, message:str, row:int = None, column:str = None):
+        """
+        Args:
+            kind (str): The kind of error, one of the constants of DataValidationError
+            message (str): The message shown to the user
+            row (int, optional): Position of the row containing the error, counting from 0 after the header row
+            column (str, optional): Name of the column containing the error
+        """
+        self.kind = kind
+        self.message = message
+        self.row = row
+        self.column = column
+
+    def __str__(self) -> str:
+        return self.message
+
+    def __repr__(self) -> str:
+        return f"DataValidationError({self.kind!r}, {self.message!r}, row={self.row!r}, column={self.column!r})"
 
-# Check if any item in any row contains the replacement character
-def check_for_replacement_char(row):
-    replacement_char = u'\ufffd'
-    for idx, cell in enumerate(row):
-        if replacement_char in str(cell):
-            return True, idx
-    return False, None
 
 def find_replacement_character_indices(df:pd.DataFrame):
-    rows_with_replacement_char = df.apply(lambda row: check_for_replacement_char(row), axis=1)
-    rows_with_replacement_char_info = [(row_num, col_num) for row_num, (found, col_num) in enumerate(rows_with_replacement_char) if found]
-    return rows_with_replacement_char_info
+    """Find the first cell in each row containing the replacement character, which replaces any
+    characters that could not be read. Only text columns are searched, since numeric columns
+    cannot contain characters.
 
-def get_replacement_character_error_messages(df:pd.DataFrame):
-    errors = []
-    replacement_character_indices = find_replacement_character_indices(df)
-    if len(replacement_character_indices) > 0:
-        errors += ["Unrecognised characters were found in this data file. Please edit the file to remove these characters and try again."]
-    for r, c in replacement_character_indices:
-        errors += [f"The item in row {r+1}, column {c+1} contains unrecognised characters: '{df.iloc[r, c]}'"]
-    return errors
+    Args:
+        df (pd.DataFrame): The loaded data
 
+    Returns:
+        list[tuple[int, int]]: The row and column positions of the cells
+    """
+    text_columns = df.select_dtypes(exclude="number").columns
+    if len(text_columns) == 0 or len(df) == 0:
+        return []
+    contains_replacement_char = np.stack([df[c].astype(str).str.contains("\ufffd", regex=False, na=False).to_numpy(dtype=bool) for c in text_columns], axis=1)
+    rows = np.flatnonzero(contains_replacement_char.any(axis=1))
+    columns = df.columns.get_indexer(text_columns)[np.argmax(contains_replacement_char[rows], axis=1)]
+    return list(zip(rows.tolist(), columns.tolist()))
+
+def validate_data(data:pd.DataFrame, file_description:str, required_columns:list[str], numeric_columns:list[str], check_ids:bool = True, check_duplicate_ids:bool = True, max_errors:int = None):
+    """Check a loaded data file, with one vectorised check per kind of error. In order, the checks are that: the
+    required columns are present, every student has an ID, no student ID is used more than once, every character
+    could be read, and the numeric columns contain only numbers.
 
-def validate_module_data(data:pd.DataFrame):
-    errors = []
-    required_columns = ["module_id", "module_name", "module_group", "semester", "credits", "capacity", "available_spaces", "required_modules", "mutually_excluded_modules"]
-    for c in required_columns:
-        if not c in data.columns:
-            errors += [f"Column '{c}' was not found in the module data file"]
+    Args:
+        data (pd.DataFrame): The loaded data
+        file_description (str): The name of the file in error messages, e.g. "Rankings file"
+        required_columns (list[str]): The columns which must be present
+        numeric_columns (list[str]): The columns which must contain only numbers (or be empty), if present
+        check_ids (bool, optional): Whether to check the student IDs. Defaults to True.
+        check_duplicate_ids (bool, optional): Whether to check that no student ID is used more than once. Defaults to True.
+        max_errors (int, optional): Stop once this many errors have been found, which must be at least 1. Defaults to None, to find every error.
 
-    errors += get_replacement_character_error_messages(data)
+    Returns:
+        list[DataValidationError]: The errors found, in the order of the checks
+    """
+    if max_errors is not None and max_errors < 1:
+        raise ValueError("max_errors must be at least 1")
+    errors:list[DataValidationError] = []
+
+    def add_errors(new_errors:list[DataValidationError]) -> bool:
+        errors.extend(new_errors)
+        return max_errors is not None and len(errors) >= max_errors
+
+    if add_errors([DataValidationError(DataValidationError.MISSING_COLUMN, f"Column '{c}' was not found in the {file_description}", column=c)
+                   for c in required_columns if c not in data.columns]):
+        return errors[:max_errors]
+
+    if check_ids and "student_id" in data.columns:
+        student_ids = data["student_id"]
+        if "student_name" in data.columns:
+            missing_ids = (student_ids.isna() | (student_ids.astype(str) == "")).to_numpy()
+            if add_errors([DataValidationError(DataValidationError.MISSING_ID, f"Student {name} has no listed student ID", row, "student_id")
+                           for row, name in zip(np.flatnonzero(missing_ids).tolist(), data["student_name"][missing_ids])]):
+                return errors[:max_errors]
+
+        if check_duplicate_ids:
+            if add_errors([DataValidationError(DataValidationError.DUPLICATE_ID, f"Student ID '{s_id}' is used more than once in the {file_description}", column="student_id")
+                           for s_id in student_ids[student_ids.duplicated()].unique()]):
+                return errors[:max_errors]
+
+    replacement_character_indices = find_replacement_character_indices(data)
+    if len(replacement_character_indices) > 0:
+        if add_errors([DataValidationError(DataValidationError.UNRECOGNISED_CHARACTERS, "Unrecognised characters were found in this data file. Please edit the file to remove these characters and try again.")]
+                      + [DataValidationError(DataValidationError.UNRECOGNISED_CHARACTERS, f"The item in row {r+1}, column {c+1} contains unrecognised characters: '{data.iloc[r, c]}'", r, data.columns[c])
+                         for r, c in replacement_character_indices]):
+            return errors[:max_errors]
+
+    # Numeric columns are read as text if they contain anything other than numbers
+    for c in numeric_columns:
+        if c not in data.columns or pd.api.types.is_numeric_dtype(data[c]):
+            continue
+        values = data[c]
+        not_numbers = (values.notna() & pd.to_numeric(values, errors="coerce").isna()).to_numpy()
+        c_idx = data.columns.get_loc(c)
+        if add_errors([DataValidationError(DataValidationError.NOT_A_NUMBER, f"The item in row {r+1}, column {c_idx+1} ('{c}') is not a number: '{v}'", r, c)
+                       for r, v in zip(np.flatnonzero(not_numbers).tolist(), values[not_numbers])]):
+            return errors[:max_errors]
+
+    return errors
 
-    return errors 
+
+def validate_module_data(data:pd.DataFrame, max_errors:int = None):
+    return validate_data(data, "module data file", MODULE_DATA_COLUMNS, ["credits", "capacity", "available_spaces"], check_ids=False, max_errors=max_errors)
 
 def load_module_data(filepath:Path):
     """Load the module data from a given csv file
@@ -53,9 +145,19 @@ def load_module_data(filepath:Path):
         loaded modules list, a set containing the IDs of any mutually 
         excluded modules not found in the loaded modules list
     """
-    module_data = pd.read_csv(filepath, encoding="utf-8", encoding_errors="replace")
-    print(module_data)
-    return module_data
+    return pd.read_csv(filepath, encoding="utf-8", encoding_errors="replace", usecols=lambda c: c in MODULE_DATA_COLUMNS, dtype=MODULE_DATA_DTYPES)
+
+def split_module_id_lists(module_id_lists:pd.Series) -> pd.Series:
+    """Split comma separated lists of module IDs, ignoring missing lists and empty IDs
+
+    Args:
+        module_id_lists (pd.Series): The lists of module IDs
+
+    Returns:
+        pd.Series: The module IDs, in order, each indexed by the position of its list in module_id_lists
+    """
+    module_ids = module_id_lists.reset_index(drop=True).dropna().astype(str).str.split(",").explode().str.strip()
+    return module_ids[module_ids.str.len() > 0]
 
 def get_formatted_module_data(module_data:pd.DataFrame):
     """Reformat the loaded dataframe containing module data into lists of required elements
@@ -75,79 +177,65 @@ def get_formatted_module_data(module_data:pd.DataFrame):
     mutually_excluded_modules_not_found = set()
 
     # Create the module objects
+    module_ids = module_data.module_id.tolist()
     loaded_modules:dict[str, Module] = dict()
-    for _, r in module_data.iterrows():
-        m = Module(r.module_id, r.module_name, r.credits, r.semester, r.module_group, r.capacity, r.available_spaces, [], [])
-        loaded_modules[r.module_id] = m
-
-    # Add mutual exclusion and requirement references between the module objects
-    for _, r in module_data.iterrows():    
-        if not pd.isna(r.mutually_excluded_modules):
-            mutually_excluded_module_ids = [str(s).strip() for s in r.mutually_excluded_modules.split(",") if len(str(s).strip()) > 0]
-            for m in mutually_excluded_module_ids:
-                if m in loaded_modules.keys():  
-                    loaded_modules[r.module_id].add_mutual_exclusions([loaded_modules[m]])
-                else:
-                    mutually_excluded_modules_not_found.add(m)
-
-        if not pd.isna(r.required_modules):
-            required_module_ids = [str(s).strip() for s in r.required_modules.split(",") if len(str(s).strip()) > 0]
-            for m in required_module_ids:
-                if m in loaded_modules.keys(): 
-                    loaded_modules[r.module_id].add_requirements([loaded_modules[m]])
-                else:
-                    required_modules_not_found.add(m)
+    for module_id, module_name, credits, semester, group, capacity, available_spaces in zip(module_ids, module_data.module_name, module_data.credits, module_data.semester, module_data.module_group, module_data.capacity, module_data.available_spaces):
+        loaded_modules[module_id] = Module(module_id, module_name, credits, semester, group, capacity, available_spaces, [], [])
 
-    return list(loaded_modules.values()), list(module_data.module_group.unique()), list(module_data.semester.unique()), required_modules_not_found, mutually_excluded_modules_not_found
+    # Mutual exclusions are symmetric, so collect them in both directions before linking the module objects
+    mutual_exclusions:dict[str, dict[str, None]] = {module_id: dict() for module_id in loaded_modules.keys()}
 
+    # Add mutual exclusion and requirement references between the module objects, in the order they are listed
+    for row, m in split_module_id_lists(module_data.mutually_excluded_modules).items():
+        if m in loaded_modules.keys():
+            mutual_exclusions[module_ids[row]][m] = None
+            mutual_exclusions[m][module_ids[row]] = None
+        else:
+            mutually_excluded_modules_not_found.add(m)
 
-def validate_module_rankings_data(data:pd.DataFrame):
-    errors = []
-    required_columns = ["student_name", "student_id"]
-    for c in required_columns:
-        if not c in data.columns:
-            errors += [f"Column '{c}' was not found in the module data file"]
-    
-    if ("student_id" in data.columns) and ("student_name" in data.columns):        
-            for name in data.loc[(data['student_id'] == '') | pd.isna(data["student_id"]), 'student_name']:
-                errors += [f"Student {name} has no listed student ID"]
-            
-            duplicate_ids = data[data.duplicated('student_id')]['student_id'].unique()
-            if (len(duplicate_ids) > 0):
-                errors += [f"Student ID '{s_id}' is used more than once in the Rankings file" for s_id in duplicate_ids]
-                
-    errors += get_replacement_character_error_messages(data)
+    for row, m in split_module_id_lists(module_data.required_modules).items():
+        if m in loaded_modules.keys():
+            loaded_modules[module_ids[row]].add_requirements([loaded_modules[m]])
+        else:
+            required_modules_not_found.add(m)
+
+    for module_id, excluded_module_ids in mutual_exclusions.items():
+        loaded_modules[module_id].mutual_exclusions = [loaded_modules[m] for m in excluded_module_ids]
 
-    return errors 
+    return list(loaded_modules.values()), list(module_data.module_group.unique()), list(module_data.semester.unique()), required_modules_not_found, mutually_excluded_modules_not_found
 
-def validate_module_group_preferences_data(data:pd.DataFrame):
-    errors = []
-    required_columns = ["student_name", "student_id"]
-    for c in required_columns:
-        if not c in data.columns:
-            errors += [f"Column '{c}' was not found in the module data file"]
-    
-    if ("student_id" in data.columns) and ("student_name" in data.columns):        
-            for name in data.loc[(data['student_id'] == '') | pd.isna(data["student_id"]), 'student_name']:
-                errors += [f"Student {name} has no listed student ID"]
 
-    duplicate_ids = data[data.duplicated('student_id')]['student_id'].unique()
-    if (len(duplicate_ids) > 0):
-        errors += [f"Student ID '{s_id}' is used more than once in the Group Preferences file" for s_id in duplicate_ids]
-                
+def validate_module_rankings_data(data:pd.DataFrame, max_errors:int = None):
+    # Every column other than the student's name, ID and excluded modules is the ranking of a module
+    ranking_columns = [c for c in data.columns if c not in STUDENT_DATA_DTYPES]
+    return validate_data(data, "Rankings file", ["student_name", "student_id"], ranking_columns, max_errors=max_errors)
 
-    errors += get_replacement_character_error_messages(data)
+def validate_module_group_preferences_data(data:pd.DataFrame, max_errors:int = None):
+    # Every column other than the student's name and ID is the preferred number of modules in a group
+    group_columns = [c for c in data.columns if c not in ["student_name", "student_id"]]
+    return validate_data(data, "Group Preferences file", ["student_name", "student_id"], group_columns, max_errors=max_errors)
 
-    return errors 
 
+def read_student_data(filepath:Path):
+    """Read a student data file. Student IDs are read as text, so surrounding whitespace is removed
+    from them straight away, before they are validated or matched between files.
 
+    Args:
+        filepath (Path): Path to the csv file
 
+    Returns:
+        pd.DataFrame: The loaded data
+    """
+    data = pd.read_csv(filepath, encoding="utf-8", encoding_errors="replace", dtype=STUDENT_DATA_DTYPES)
+    if "student_id" in data.columns:
+        data["student_id"] = data["student_id"].str.strip()
+    return data
 
 def load_module_rankings_data(module_preference_data_filepath:Path):
-    return pd.read_csv(module_preference_data_filepath, encoding="utf-8", encoding_errors="replace")
+    return read_student_data(module_preference_data_filepath)
 
 def load_module_group_preferences_data(module_group_preference_data_filepath:Path):
-    return pd.read_csv(module_group_preference_data_filepath, encoding="utf-8", encoding_errors="replace")
+    return read_student_data(module_group_preference_data_filepath)
 
 
 
@@ -180,75 +268,77 @@ def load_students(module_rankings_data:pd.DataFrame, module_group_preference_dat
         modules (list[Module]): List of Module objects
 
     Returns:
-        (list[Student], list[Student], list[Student], list[str]): A list of loaded Student objects, a list of students who did 
+        (StudentCohort, list[Student], list[Student], list[str]): The loaded students, a list of students who did 
         not rank every module, a list of students with missing IDs, a list of module IDs not ranked by the students
     """
       
 
-    loaded_student_module_group_preferences:dict[str, dict[str, int]] = dict()
-    loaded_students:dict[str, Student] = dict()
+    def student_to_uid(data:pd.DataFrame) -> pd.Series:
+        n = data.student_name.astype(str).str.lower().str.strip().str.replace(" ", "")
+        i = data.student_id.astype(str).str.strip().str.replace(" ", "").where(data.student_id.notna(), "")
+        return n + "_" + i
 
-    def student_to_uid(r):
-        n = str(r.student_name).lower().strip().replace(" ", "")
-        i = str(r.student_id).strip().replace(" ", "")
-        if not pd.isna(r.student_id):
-            return f"{n}_{i}"
-        else:
-            return f"{n}_"
-
-    # Keep track of any students who don't have rankings for all modules
-    students_missing_ranks = []
-    students_missing_ids = []
+    def get_unique_student_rows(uids:pd.Series) -> tuple[np.ndarray, pd.Index]:
+        # Each student's data is taken from the last row with their identifier, and students are ordered by their first row
+        codes, unique_uids = pd.factorize(uids)
+        rows = np.zeros(len(unique_uids), dtype=np.intp)
+        rows[codes] = np.arange(len(codes))
+        return rows, unique_uids
 
     # Get the group preferences for each student
     group_names = [col for col in module_group_preference_data.columns if col not in ["student_name", "student_id"]]
-    for _, r in module_group_preference_data.iterrows():
-        loaded_student_module_group_preferences[student_to_uid(r)] = dict(zip(group_names, [r[g] for g in group_names]))
+    group_preference_rows, group_preference_uids = get_unique_student_rows(student_to_uid(module_group_preference_data))
+    group_preferences = {g: module_group_preference_data[g].to_numpy()[group_preference_rows] for g in group_names}
+
+    # Get the rows of the rankings file for each student
+    ranking_rows, student_uids = get_unique_student_rows(student_to_uid(module_rankings_data))
+    rankings_data = module_rankings_data.iloc[ranking_rows].reset_index(drop=True)
+    group_preference_idxs = group_preference_uids.get_indexer(student_uids)
+    if np.any(group_preference_idxs < 0):
+        raise KeyError(student_uids[np.argmax(group_preference_idxs < 0)])
+
+    # Get the rank of each module for each student, as a (# students, # modules) matrix
+    module_ids = [m.module_id for m in modules]
+    ranked_module_ids = [m_id for m_id in module_ids if m_id in module_rankings_data.columns]
+    module_rankings = rankings_data.reindex(columns=module_ids).to_numpy(dtype=np.float64, na_value=np.nan)
+    module_rankings = np.where(np.isnan(module_rankings), StudentCohort.UNRANKED, module_rankings)
 
-    # Create the Student objects, containing module group preferences and within group ranks
-    for _, r in module_rankings_data.iterrows():
-        student_uid = student_to_uid(r)
-
-        # Check if the student has a ranking value for every module
-        all_modules_are_ranked = np.all([not pd.isna(r[m.module_id]) for m in modules if m.module_id in r.index])
-        
-        # Get the module-to-rank dictionary for this student
-        module_rankings = dict(zip([m.module_id for m in modules if m.module_id in r.index], [(r[m.module_id] if not pd.isna(r[m.module_id]) else np.inf) for m in modules if m.module_id in r.index]))
-
-        # Get the list of excluded modules for this student
-        excluded_modules = [m.module_id for m in modules if m.module_id in r.excluded_modules] if not pd.isna(r.excluded_modules) else []
+    # Keep track of any students who don't have rankings for all modules
+    all_modules_are_ranked = module_rankings_data[ranked_module_ids].notna().all(axis=1).to_numpy()
+    students_missing_ranks = module_rankings_data.student_id[~all_modules_are_ranked].tolist()
+    students_missing_ids = module_rankings_data.student_name[module_rankings_data.student_id.isna()].tolist()
 
-        # Create the Student object to contain this student's data
-        student_id = r.student_id
-        if pd.isna(r.student_id):
-            students_missing_ids.append(r.student_name)
-            student_id = r.student_name
-        s = Student(r.student_name, str(student_id).strip(), loaded_student_module_group_preferences[student_uid], module_rankings, excluded_modules)
-        loaded_students[student_uid] = s        
+    # Get which modules are excluded by each student, from their comma separated lists of excluded module IDs
+    excluded_modules = np.zeros((len(student_uids), len(module_ids)), dtype=bool)
+    if "excluded_modules" in rankings_data.columns:
+        excluded_module_ids = split_module_id_lists(rankings_data.excluded_modules)
+        excluded_module_idxs = pd.Index(module_ids).get_indexer(excluded_module_ids)
+        excluded = excluded_module_idxs >= 0
+        excluded_modules[excluded_module_ids.index[excluded], excluded_module_idxs[excluded]] = True
 
-        if not all_modules_are_ranked:
-            students_missing_ranks.append(r.student_id)
+    # Students without an ID are identified by their name
+    student_ids = rankings_data.student_id.where(rankings_data.student_id.notna(), rankings_data.student_name).astype(str).str.strip()
 
     # List of modules not ranked by the students
-    missing_modules = [m.module_id for m in modules if m.module_id not in module_rankings_data.columns]
+    missing_modules = [m_id for m_id in module_ids if m_id not in module_rankings_data.columns]
+
+    students = StudentCohort(
+        rankings_data.student_name.tolist(),
+        student_ids.tolist(),
+        module_ids,
+        module_rankings,
+        excluded_modules,
+        group_names,
+        np.array([group_preferences[g][group_preference_idxs] for g in group_names]).T.reshape(len(student_uids), len(group_names)),
+    )
 
-    return list(loaded_students.values()), students_missing_ranks, students_missing_ids, missing_modules
+    return students, students_missing_ranks, students_missing_ids, missing_modules
 
 def load_module_assignments(module_assignments_data_filepath:Path):
-    module_assignments_data = pd.read_csv(module_assignments_data_filepath, encoding="utf-8", encoding_errors="replace")
+    module_assignments_data = read_student_data(module_assignments_data_filepath)
     return module_assignments_data
 
-def validate_module_assignments_data(data:pd.DataFrame):
-    errors = []
-    required_columns = ["student_name", "student_id"]
-    for c in required_columns:
-        if not c in data.columns:
-            errors += [f"Column '{c}' was not found in the module data file"]
-    
-    if ("student_id" in data.columns) and ("student_name" in data.columns):        
-            for name in data.loc[(data['student_id'] == '') | pd.isna(data["student_id"]), 'student_name']:
-                errors += [f"Student {name} has no listed student ID"]
-
-    errors += get_replacement_character_error_messages(data)
-    
-    return errors 
\ No newline at end of file
+def validate_module_assignments_data(data:pd.DataFrame, max_errors:int = None):
+    # Every column other than the student's name and ID is a module, or a preferred number of modules in a group
+    assignment_columns = [c for c in data.columns if c not in ["student_name", "student_id"]]
+    return validate_data(data, "previous module assignments file", ["student_name", "student_id"], assignment_columns, check_duplicate_ids=False, max_errors=max_errors)
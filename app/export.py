@@ -0,0 +1,137 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+import pandas as pd
+
+from algorithm import AssignmentResult
+
+
+def get_constraints_summary(result:AssignmentResult):
+    """Get a table of which credit constraints are satisfied for each student
+
+    Args:
+        result (AssignmentResult): The assignment
+
+    Returns:
+        pd.DataFrame: The student names and IDs, with one boolean column per constraint
+    """
+    return pd.concat([result.get_students_list(), result.constraint_report.get_summary()], axis=1)
+
+
+def write_assignment_files(zf:ZipFile, result:AssignmentResult, folder:str = ""):
+    """Write the results of a module assignment to an open ZIP file: a csv file of the
+    students assigned to each module, and csv files summarising the assignment
+
+    Args:
+        zf (ZipFile): The ZIP file to write to
+        result (AssignmentResult): The assignment
+        folder (str, optional): Folder in the ZIP file to write the files to. Defaults to the top level.
+    """
+    module_ids, assigned_students_data = result.get_assigned_module_students()
+
+    # Write the csv files containing student IDs assigned to each module
+    for m_idx, m in enumerate(module_ids):
+        b = BytesIO()
+        assigned_students_data[m_idx].to_csv(b, index=False, header=True)
+        zf.writestr(f"{folder}{m}.csv", b.getvalue())
+
+    # Write the summary of all module assignments for all students to an csv file
+    b_assignment_summary = BytesIO()
+    result.get_all_assigned_modules().to_csv(b_assignment_summary, index=False, header=True)
+    zf.writestr(f"{folder}module_assignment_summary.csv", b_assignment_summary.getvalue())
+
+    # Write which credit constraints are satisfied for each student to an csv file
+    b_constraints_summary = BytesIO()
+    get_constraints_summary(result).to_csv(b_constraints_summary, index=False, header=True)
+    zf.writestr(f"{folder}constraints_summary.csv", b_constraints_summary.getvalue())
+
+    # Write data on excess module requests to an csv file
+    b_over_requested_modules = BytesIO()
+    result.get_excess_module_requests().sort_values("excess_requests", ascending=False).to_csv(b_over_requested_modules, index=False, header=True)
+    zf.writestr(f"{folder}excess_module_requests.csv", b_over_requested_modules.getvalue())
+
+    # Write the list of modules and associated metadata (including remaining spaces on each module) back to an csv file
+    b_module_allocation_state = BytesIO()
+    result.get_module_dataframe().to_csv(b_module_allocation_state, index=False, header=True)
+    zf.writestr(f"{folder}module_metadata.csv", b_module_allocation_state.getvalue())
+
+
+def write_assignment_zip(result:AssignmentResult, file):
+    """Write the results of a module assignment to a ZIP file (see write_assignment_files)
+
+    Args:
+        result (AssignmentResult): The assignment
+        file: Path or binary file object to write the ZIP file to
+    """
+    with ZipFile(file, "w") as zf:
+        write_assignment_files(zf, result)
+
+
+def get_result_folder(rank:int, result:AssignmentResult) -> str:
+    if result.repetition is None:
+        return f"rank_{rank}/"
+    return f"rank_{rank}_repetition_{result.repetition + 1}/"
+
+
+def get_results_summary(results:list[AssignmentResult]):
+    """Get a table comparing several module assignments
+
+    Args:
+        results (list[AssignmentResult]): The assignments, best first
+
+    Returns:
+        pd.DataFrame: One row per assignment, with its rank, repetition and metrics
+    """
+    return pd.DataFrame({
+        "rank": range(1, len(results) + 1),
+        "repetition": [r.repetition + 1 if r.repetition is not None else None for r in results],
+        "folder": [get_result_folder(rank, r) for rank, r in enumerate(results, start=1)],
+        "mean_satisfaction_score": [r.mean_satisfaction_score for r in results],
+        "mean_proportion_overrequested": [r.mean_proportion_overrequested for r in results],
+        "constraints_satisfied": [r.constraints_satisfied for r in results],
+    })
+
+
+def write_assignments_zip(results:list[AssignmentResult], file):
+    """Write the results of several module assignments to one ZIP file, with a table comparing
+    the assignments and a folder of results (see write_assignment_files) for each assignment
+
+    Args:
+        results (list[AssignmentResult]): The assignments, best first
+        file: Path or binary file object to write the ZIP file to
+    """
+    with ZipFile(file, "w") as zf:
+        b_results_summary = BytesIO()
+        get_results_summary(results).to_csv(b_results_summary, index=False, header=True)
+        zf.writestr("assignments_summary.csv", b_results_summary.getvalue())
+
+        for rank, result in enumerate(results, start=1):
+            write_assignment_files(zf, result, get_result_folder(rank, result))
+
+
+def get_assignment_zip(result:AssignmentResult) -> bytes:
+    """Get the contents of the ZIP file written by write_assignment_zip
+
+    Args:
+        result (AssignmentResult): The assignment
+
+    Returns:
+        bytes: The contents of the ZIP file
+    """
+    zip_file = BytesIO()
+    write_assignment_zip(result, zip_file)
+    return zip_file.getvalue()
+
+
+def get_assignments_zip(results:list[AssignmentResult]) -> bytes:
+    """Get the contents of the ZIP file written by write_assignments_zip
+
+    Args:
+        results (list[AssignmentResult]): The assignments, best first
+
+    Returns:
+        bytes: The contents of the ZIP file
+    """
+    zip_file = BytesIO()
+    write_assignments_zip(results, zip_file)
+    return zip_file.getvalue()
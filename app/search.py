@@ -0,0 +1,241 @@
+import heapq
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from algorithm import AssignmentResult, Module, ModuleAssigner, ModuleCatalogue, Student, StudentCohort
+
+BASE_RANDOM_SEED = 8194761
+
+
+class TopAssignmentResults:
+    """The best results of a search, up to a fixed number of results. Results are ranked by
+    mean satisfaction score, with later repetitions ranked above earlier ones with the same
+    score (as when choosing the best result of a search).
+    """
+
+    def __init__(self, max_results:int):
+        self.max_results = max_results
+
+        # Min-heap of (ranking key, result), so the worst result kept is always first
+        self._heap:list[tuple[tuple[float, int], AssignmentResult]] = []
+
+    @staticmethod
+    def get_ranking_key(result:AssignmentResult) -> tuple[float, int]:
+        score = result.mean_satisfaction_score
+        return (score if not math.isnan(score) else -math.inf, result.repetition)
+
+    def add(self, result:AssignmentResult) -> bool:
+        """Keep a result if it is one of the best results so far, in O(log(max_results)) time
+
+        Args:
+            result (AssignmentResult): The result of a repetition of a search
+
+        Returns:
+            bool: True iff the result was kept
+        """
+        entry = (self.get_ranking_key(result), result)
+        if len(self._heap) < self.max_results:
+            heapq.heappush(self._heap, entry)
+            return True
+        if len(self._heap) > 0 and entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def get_results(self) -> list[AssignmentResult]:
+        """
+        Returns:
+            list[AssignmentResult]: The results kept, best first
+        """
+        return [result for _, result in sorted(self._heap, key=lambda entry: entry[0], reverse=True)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class AssignmentSearch:
+    """Random search for the best module assignment, over repetitions of the assignment algorithm
+    with different random seeds. Repetitions can be run on a pool of worker processes.
+    """
+
+    def __init__(self, students:list[Student] | StudentCohort, modules:list[Module] | ModuleCatalogue, required_credits_per_student:int, max_credits_per_group:dict[str, int], max_credits_per_semester:dict[str, int], min_credits_per_group:dict[str, int], min_credits_per_semester:dict[str, int], base_random_seed:int, max_rounds:int = None, check_constraints:bool = False, loaded_module_assignments:pd.DataFrame = None):
+        self.students = students if isinstance(students, StudentCohort) else StudentCohort.from_students(students)
+        self.modules = modules if isinstance(modules, ModuleCatalogue) else ModuleCatalogue(modules)
+        self.required_credits_per_student = required_credits_per_student
+        self.max_credits_per_group = max_credits_per_group
+        self.max_credits_per_semester = max_credits_per_semester
+        self.min_credits_per_group = min_credits_per_group
+        self.min_credits_per_semester = min_credits_per_semester
+        self.base_random_seed = base_random_seed
+        self.max_rounds = max_rounds
+        self.check_constraints = check_constraints
+        self.loaded_module_assignments = loaded_module_assignments
+
+        # The best assignment found so far by run, which can be read while the search is still running
+        self.best_result:AssignmentResult = None
+        self.top_results = TopAssignmentResults(1)
+        self.n_completed_repetitions = 0
+
+    def get_random_seed(self, repetition:int) -> np.random.SeedSequence:
+        """Get the seed of a repetition. Each repetition has its own independent random number stream, spawned
+        from the base random seed, so any repetition can be recomputed from only the base seed and its index.
+
+        Args:
+            repetition (int): Index of the repetition
+
+        Returns:
+            np.random.SeedSequence: The seed, equal to the repetition-th child of SeedSequence(base_random_seed)
+        """
+        return np.random.SeedSequence(self.base_random_seed, spawn_key=(repetition,))
+
+    def create_assigner(self, repetition:int) -> ModuleAssigner:
+        """Create a module assigner for one repetition, with any pre-existing module assignments loaded
+
+        Args:
+            repetition (int): Index of the repetition
+
+        Returns:
+            ModuleAssigner: The module assigner
+        """
+        module_assigner = ModuleAssigner(self.students, self.modules, self.required_credits_per_student, self.max_credits_per_group,
+                                         self.max_credits_per_semester, self.min_credits_per_group, self.min_credits_per_semester,
+                                         self.get_random_seed(repetition))
+        if self.loaded_module_assignments is not None:
+            module_assigner.set_loaded_module_assignments(self.loaded_module_assignments)
+        return module_assigner
+
+    def run_repetition(self, repetition:int) -> AssignmentResult:
+        """Run the assignment algorithm for one repetition. Any repetition can be run again on its
+        own with the same result, e.g. to recompute the best repetition of a search.
+
+        Args:
+            repetition (int): Index of the repetition
+
+        Returns:
+            AssignmentResult: The resulting assignment
+        """
+        module_assigner = self.create_assigner(repetition)
+        n_rounds = module_assigner.run_assignment_rounds(self.max_rounds)
+        return module_assigner.get_result(repetition, n_rounds)
+
+    def run(self, n_repetitions:int = None, n_workers:int = None, progress:Callable[[int, AssignmentResult], None] = None, time_budget:float = None, plateau_repetitions:int = None, plateau_epsilon:float = 0.0, n_top_results:int = 1) -> AssignmentResult:
+        """Run repetitions of the assignment algorithm, and keep the best assignment. Repetitions are compared in
+        order, so the best assignment does not depend on the number of workers. The search stops when the first
+        of its stopping conditions is met, and the best assignment so far is kept in self.best_result throughout.
+
+        Args:
+            n_repetitions (int, optional): The number of repetitions to run. Defaults to None, to keep running
+                repetitions until the time budget is used up or the best assignment stops improving.
+            n_workers (int, optional): The number of worker processes. Defaults to None, for one per CPU. Repetitions
+                are run in this process if this is 1, or if worker processes are not available (e.g. in a browser).
+            progress (Callable[[int, AssignmentResult], None], optional): Called with the number of completed
+                repetitions and the latest result after each repetition
+            time_budget (float, optional): Stop after the first repetition that finishes once this many seconds
+                have passed. Defaults to None, for no time limit.
+            plateau_repetitions (int, optional): Stop once this many repetitions have passed without the mean
+                satisfaction score of the best assignment improving by more than plateau_epsilon. Defaults to None,
+                to never stop for this reason.
+            plateau_epsilon (float, optional): The smallest improvement in mean satisfaction score which counts as
+                an improvement for plateau_repetitions. Defaults to 0.0.
+            n_top_results (int, optional): The number of best assignments to keep in self.top_results, e.g. to
+                compare alternatives to the best assignment. Defaults to 1.
+
+        Returns:
+            AssignmentResult: The best assignment, or None if no assignment satisfied the constraints
+        """
+        if n_repetitions is None and time_budget is None and plateau_repetitions is None:
+            raise ValueError("At least one of n_repetitions, time_budget or plateau_repetitions must be given")
+
+        start_time = time.monotonic()
+        self.best_result = None
+        self.top_results = TopAssignmentResults(n_top_results)
+        self.n_completed_repetitions = 0
+
+        # The mean satisfaction score which later repetitions must improve on to count as progress
+        plateau_score = None
+        last_improvement = 0
+
+        repetitions = range(n_repetitions) if n_repetitions is not None else count()
+        repetition_results = self.iterate_repetitions(repetitions, n_workers)
+        for result in repetition_results:
+            self.n_completed_repetitions += 1
+            if result.constraints_satisfied or not self.check_constraints:
+                self.top_results.add(result)
+                if result.is_better_than(self.best_result):
+                    self.best_result = result
+                    if plateau_score is None or result.mean_satisfaction_score > plateau_score + plateau_epsilon:
+                        plateau_score = result.mean_satisfaction_score
+                        last_improvement = self.n_completed_repetitions
+            if progress is not None:
+                progress(self.n_completed_repetitions, result)
+            if time_budget is not None and time.monotonic() - start_time >= time_budget:
+                break
+            if plateau_repetitions is not None and self.n_completed_repetitions - last_improvement >= plateau_repetitions:
+                break
+        repetition_results.close()
+        return self.best_result
+
+    def iterate_repetitions(self, repetitions:Iterable[int], n_workers:int = None):
+        """Run the given repetitions, yielding their results in order
+
+        Args:
+            repetitions (Iterable[int]): Indices of the repetitions to run, which may be unbounded
+            n_workers (int, optional): The number of worker processes. Defaults to None, for one per CPU.
+
+        Yields:
+            AssignmentResult: The result of each repetition
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        if isinstance(repetitions, range):
+            n_workers = min(n_workers, len(repetitions))
+        executor = None
+        if n_workers > 1 and sys.platform != "emscripten":
+            try:
+                executor = ProcessPoolExecutor(n_workers, initializer=_set_worker_search, initargs=(self,))
+            except (ImportError, NotImplementedError, OSError):
+                executor = None
+
+        if executor is None:
+            for repetition in repetitions:
+                yield self.run_repetition(repetition)
+            return
+
+        def receive(result:AssignmentResult) -> AssignmentResult:
+            result._attach(self.students, self.modules)
+            return result
+
+        # Only keep a few repetitions queued per worker, so that little work is wasted if the search stops early
+        pending = deque()
+        try:
+            for repetition in repetitions:
+                pending.append(executor.submit(_run_worker_repetition, repetition))
+                if len(pending) >= 2 * n_workers:
+                    yield receive(pending.popleft().result())
+            while len(pending) > 0:
+                yield receive(pending.popleft().result())
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+# The search run by each worker process, so that the students and modules are only sent to each worker once
+_worker_search:AssignmentSearch = None
+
+def _set_worker_search(search:AssignmentSearch):
+    global _worker_search
+    _worker_search = search
+
+def _run_worker_repetition(repetition:int) -> AssignmentResult:
+    result = _worker_search.run_repetition(repetition)
+
+    # Compute the metrics used to compare results in the worker, and send the result without the students and modules
+    result.mean_satisfaction_score, result.mean_proportion_overrequested, result.constraints_satisfied
+    return result._detach()